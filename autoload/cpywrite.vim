@@ -11,21 +11,42 @@ let g:autoloaded_cpywrite = 1
 
 if has('python3')
     if empty(get(s:, 'cpywrite_python_cmd', ''))
-        let s:cpywrite_python_cmd = (has('python3') ? 'py3' : 'py') . 'file'
+        let s:cpywrite_python_cmd = (has('python3') ? 'py3' : 'py')
     endif
 endif
 
 func! cpywrite#PrependHeader(...) abort
     let l:loader = cpywrite#GetInterpreter()
 
+    " hand off to the remote plugin host, if registered
+    if has('nvim') && get(g:, 'cpywrite#async', 0) && exists('*CPYwriteAsync')
+        call CPYwriteAsync(get(a:, 1, g:cpywrite#default_license))
+        return
+    endif
+
     if empty(loader)
         call cpywrite#error#NoPython()
     else
         let l:license_name = get(a:, 1, g:cpywrite#default_license)
-          exe loader
-              \ fnamemodify(
-              \   globpath(&rtp, 'plugin/cpywrite/main.py', 0, 1)[0],
-              \   ':p')
+        exe loader 'import cpywrite_vim; cpywrite_vim.prepend()'
+    endif
+endfunc
+
+func! cpywrite#ShowStats() abort
+    if has('nvim') && get(g:, 'cpywrite#async', 0) && exists('*CPYwriteAsyncStats')
+        let l:stats = CPYwriteAsyncStats()
+    elseif empty(cpywrite#GetInterpreter())
+        call cpywrite#error#NoPython()
+        return
+    else
+        exe cpywrite#GetInterpreter() 'import cpywrite_vim'
+        let l:stats = call(cpywrite#GetInterpreter() . 'eval', ['cpywrite_vim.stats()'])
+    endif
+
+    if empty(l:stats)
+        echo 'No timings recorded. Start the editor with $CPYWRITE_PROFILE set to 1'
+    else
+        echo join(l:stats, "\n")
     endif
 endfunc
 
@@ -19,17 +19,14 @@ endfunc
 
 func! cpywrite#licenses#GetLicenseList(a,l,p) abort
     let l:loader = cpywrite#GetInterpreter()
-    let s:license_list = []
 
     if empty(loader)
       call cpywrite#error#NoPython()
-    else
-        let l:subs = get(a:, 'a', '')
-        exe loader
-            \ fnamemodify(
-            \   globpath(&rtp, 'plugin/cpywrite/tabs.py', 0, 1)[0],
-            \ ':p')
+      return []
     endif
 
-    return s:license_list
+    let l:subs = get(a:, 'a', '')
+    exe loader 'import cpywrite_vim'
+
+    return call(loader . 'eval', ['cpywrite_vim.match_license()'])
 endfunc
@@ -35,6 +35,10 @@ if !exists('g:cpywrite#preserve_shebangs')
     let g:cpywrite#preserve_shebangs = 1
 endif
 
+if !exists('g:cpywrite#async')
+    let g:cpywrite#async = 0
+endif
+
 if !exists(':CPYwrite')
     com! -nargs=* -complete=customlist,cpywrite#licenses#GetLicenseList
       \ CPYwrite :call cpywrite#PrependHeader(<f-args>)
@@ -75,6 +79,10 @@ if !exists(':CPYwriteKeepShebangs')
     \   echo (g:cpywrite#preserve_shebangs) ? "preserve existing" : "overwrite"'
 endif
 
+if !exists(':CPYwriteStats')
+    com! CPYwriteStats :call cpywrite#ShowStats()
+endif
+
 nnoremap <silent> <Plug>(cpywrite)
     \ :exe 'CPYwrite ' . g:cpywrite#default_license . ' '<CR>
 
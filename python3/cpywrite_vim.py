@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+Entry points called from the autoload scripts.
+
+Vim and Neovim put every {rtp}/python3 directory on sys.path, so this module
+is imported once per session and stays loaded between commands
+"""
+import json
+import os
+import sys
+import vim
+
+_RPLUGIN_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'rplugin', 'python3')
+"""
+Location of the cpywrite package, relative to this plugin's root
+"""
+
+if _RPLUGIN_DIR not in sys.path:
+    sys.path.append(_RPLUGIN_DIR)
+
+from cpywrite.spdx.license import complete
+from cpywrite.spdx.search import search
+from cpywrite.editor import (insert_header, make_generator, read_snapshot,
+                             snapshot_expr)
+from cpywrite.timing import enable, enabled, records, timed
+
+__all__ = ['match_license', 'prepend', 'stats']
+
+if enabled():
+    # messages on stderr would interrupt the user; keep timings for stats()
+    enable(echo=False)
+
+
+def prepend():
+    """Prepend license header to the open buffer"""
+    if vim.current.buffer:
+        state, invalid = read_snapshot(
+            vim.eval(snapshot_expr('l:license_name')))
+
+        for name in invalid:
+            print("'g:cpywrite#%s' should be set to a number!" % name,
+                  file=sys.stderr)
+            vim.command('let g:cpywrite#%s=0' % name)
+
+        try:
+            generator = make_generator(state['filename'], state['filetype'],
+                                       state['license_name'],
+                                       state['commentstring'])
+        except ValueError as exc:
+            raise vim.error from exc
+
+        if not generator:
+            return
+
+        try:
+            _write_header(generator, vim.current.buffer, state)
+        except vim.error as exc:
+            print(str(exc))
+            return
+
+def match_license():
+    """
+    Return the license names starting with the user's input, or else the
+    closest matches to it, e.g. 'lesser.general'
+    """
+    try:
+        subs = vim.eval('l:subs')
+        return complete(subs) or search(subs)
+    except vim.error:
+        return []
+
+def stats():
+    """Return the most recently timed phases, as JSON strings"""
+    return [json.dumps(entry) for entry in records()]
+
+@timed('write_header')
+def _write_header(writer, curr_buffer, state):
+    """Write the license header"""
+    options = state['options']
+
+    try:
+        header = writer.fetch_license_header(options['verbatim_mode'],
+                                             options['machine_readable'],
+                                             options['hide_filename'],
+                                             options['no_anonymous'])
+
+        if header:
+            insert_header(curr_buffer, header, state['filetype'],
+                          state['filename'], options['preserve_shebangs'],
+                          options['java#add_class_doc'])
+
+    except (ValueError, vim.error) as exc:
+        print(str(exc))
+        vim.current.window.cursor = state['cursor']
+        return
@@ -33,5 +33,11 @@ __authors__ = ['Robert Di Pardo', 'Mateusz Stadnik']
 __url__ = 'https://github.com/rdipardo/vim-cpywrite'
 __license__ = 'MIT'
 
+import sys
 from .generator import Generator
 from .spdx.license import licenses
+
+# only a Neovim host will have loaded pynvim already; don't make anyone else
+# pay to import it
+if 'pynvim' in sys.modules:
+    from .remote import CPYwritePlugin
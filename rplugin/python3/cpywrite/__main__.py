@@ -3,11 +3,28 @@
 """
 Module entry point, when invoked at the command line
 """
+import json
+import os
+import re
+import shutil
+import stat
 import sys
 import tempfile
-from os import path
 from argparse import ArgumentParser, ArgumentError
+from codecs import getincrementaldecoder
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from os import path
+from time import perf_counter
+from cpywrite.detect import find_header, fingerprint, has_notice, \
+    license_changed, matches_header, read_head, spdx_id, update_header
 from cpywrite.generator import Generator, extensions
+from cpywrite.spdx import archive, cache
+from cpywrite.spdx.license import License, prefetch
+from cpywrite.spdx.search import license_names, search
+from cpywrite.timing import enable, timed
+from cpywrite.walker import walk
 
 def main():
     """Prepend a license header to a new or existing source file"""
@@ -31,6 +48,59 @@ def main():
                         dest='short_name', default='Apache-2.0',
                         help="SPDX identifier of an open source license \
                          [%(default)s]")
+    parser.add_argument('--search', action="store", type=str,
+                        metavar='QUERY', dest='query', default=None,
+                        help="list the licenses best matching QUERY, e.g. \
+                        'bsd 3' or 'lesser general', then exit")
+    parser.add_argument('-r', '--recursive', action="store_true",
+                        dest='recursive', default=False,
+                        help="write every source file under the directories \
+                        given as FILES, except those matched by .gitignore \
+                        files or --exclude patterns")
+    parser.add_argument('--exclude', action="append", metavar='PATTERN',
+                        dest='excludes', default=[],
+                        help="with -r, skip paths matching this .gitignore \
+                        style PATTERN (may be repeated)")
+    parser.add_argument('-s', '--skip-existing', action="store_true",
+                        dest='skip_existing', default=False,
+                        help="leave files alone if they already have an SPDX \
+                        tag, a copyright notice in a comment, or the same \
+                        license terms near the top")
+    parser.add_argument('-u', '--update', action="store_true",
+                        dest='update', default=False,
+                        help="instead of adding headers, bring existing ones \
+                        up to date: extend the copyright year to the current \
+                        one, and replace the license terms if they differ")
+    parser.add_argument('-c', '--check', action="store_true",
+                        dest='check', default=False,
+                        help="instead of writing anything, verify that FILES \
+                        (and any files in directories among them) have a \
+                        header or SPDX tag for the license; exit with 1 if \
+                        any don't")
+    parser.add_argument('--report', action="store", type=str,
+                        metavar='PATH', dest='report', default=None,
+                        help="with --check, write a JSON report of each \
+                        file's status and timing to PATH, or stdout if '-'")
+    parser.add_argument('-j', '--jobs', action="store", type=int,
+                        metavar='N', dest='jobs', default=1,
+                        help="write up to N files at once, or as many as \
+                        there are cores if N is 0 [%(default)s]")
+    parser.add_argument('--profile', action="store_true",
+                        dest='profile', default=False,
+                        help="write the wall time of each phase of the work, \
+                        e.g. fetching, parsing and rendering, to stderr as \
+                        JSON lines (same as setting $CPYWRITE_PROFILE=1)")
+    parser.add_argument('--prefetch', nargs='*', metavar='ID',
+                        dest='prefetch', default=None,
+                        help="download the given licenses, or 'all' (the \
+                        default), into the cache at %s, then exit"
+                        % (cache.cache_dir().replace('%', '%%')))
+    parser.add_argument('--build-archive', action="store", type=str,
+                        metavar='PATH', dest='archive_path', default=None,
+                        help="bundle all cached license data into an offline \
+                        archive at PATH, then exit (licenses are looked up in \
+                        %s, or $CPYWRITE_ARCHIVE)"
+                        % (archive.archive_path().replace('%', '%%')))
     parser.add_argument('files', nargs='*', metavar='FILES', type=str,
                         help='name(s) of output file(s) (supported extensions: \
                         %s)' % (', '.join(extensions())))
@@ -43,46 +113,420 @@ def main():
         args = parser.parse_args()
         filenames = args.files
 
+        if args.jobs < 0:
+            parser.error('argument -j/--jobs: must not be negative')
+
+        if args.profile:
+            enable()
+
+        if args.query is not None:
+            sys.exit(_search(args.query))
+
+        if args.prefetch is not None or args.archive_path:
+            status = 0
+            if args.prefetch is not None:
+                status = _prefetch(args.prefetch)
+            if args.archive_path:
+                status = _build_archive(args.archive_path) or status
+            sys.exit(status)
+
         if filenames:
-            generator = Generator()
-            for fnm in map(str.strip, filenames):
-                generator.set_file_props(filename=fnm, rights=args.short_name)
-                source_file = ''
-                license_text = \
-                    generator.fetch_license_header(args.verbatim_mode,
-                                                   args.cpu_readable,
-                                                   args.no_name,
-                                                   args.no_anon)
-                if license_text:
-                    if not path.exists(generator.out_file):
-                        with open(generator.out_file, 'w', encoding='utf-8') as src:
-                            src.truncate(8)
-
-                        print("Created new %s file: %s"
-                              % (generator.lang, generator.out_file))
-                    else:
-                        with open(generator.out_file + '.bak', 'w', encoding='utf-8') as bak:
-                            with open(generator.out_file, 'rt', encoding='utf-8') as source:
-                                source_file = source.read()
-                                bak.write(source_file)
-
-                    _, tmp_source = tempfile.mkstemp(text=True)
-
-                    with open(tmp_source, 'w', encoding='utf-8') as tmp:
-                        tmp.write("%s%s" % (license_text, source_file))
-
-                    with open(tmp_source, 'rt', encoding='utf-8') as new_content:
-                        with open(generator.out_file, 'w', encoding='utf-8') as source:
-                            source.write(new_content.read())
-
-                else:
-                    raise IOError("Error writing file '%s'."
-                                  % (generator.out_file))
+            License(args.short_name)
+            filenames = map(str.strip, filenames)
+            if args.recursive or args.check:
+                filenames = walk(filenames, args.excludes)
+            if args.check:
+                sys.exit(_check_files(filenames, args))
+            sys.exit(_write_files(filenames, args))
 
     except (ArgumentError, UnicodeDecodeError, IOError, AttributeError, ValueError) as exc:
         print(str(exc))
         sys.exit(1)
 
 
+def _write_files(filenames, args):
+    """
+    Prepend headers to the given files, running up to args.jobs at once.
+    Reports results in the order given, then lists any files that failed,
+    returning a non-zero status if any did
+    """
+    failed = []
+    total = 0
+
+    def _write_one(filename):
+        try:
+            return (filename, _write_file(filename, args), None)
+        except (UnicodeDecodeError, IOError, OSError, ValueError) as exc:
+            return (filename, None, str(exc))
+
+    for filename, message, error in _run_jobs(_write_one, filenames, args.jobs):
+        total += 1
+        if message:
+            print(message)
+        if error:
+            failed.append((filename, error))
+
+    if not failed:
+        return 0
+
+    if total == 1:
+        print(failed[0][1])
+    else:
+        print("%d of %d file(s) failed:" % (len(failed), total))
+        for filename, error in failed:
+            print("  %s: %s" % (filename, error))
+
+    return 1
+
+def _check_files(filenames, args):
+    """
+    Verify that the given files have a header for the requested license,
+    running up to args.jobs checks at once. Lists the files that don't, and
+    writes a JSON report to args.report, if given. Returns a non-zero status
+    if any file fails the check
+    """
+    started = perf_counter()
+    results = []
+    summary = {status: 0 for status in _CHECK_STATUSES}
+    expected = License(args.short_name).spdx_code
+
+    def _check_one(filename):
+        file_started = perf_counter()
+        try:
+            status, detail = _check_file(filename, expected, args)
+        except (IOError, OSError, ValueError) as exc:
+            status, detail = ('error', str(exc))
+
+        return {'file': filename, 'status': status, 'detail': detail,
+                'seconds': round(perf_counter() - file_started, 6)}
+
+    for result in _run_jobs(_check_one, filenames, args.jobs):
+        results.append(result)
+        summary[result['status']] += 1
+        if result['status'] != 'ok' and args.report != '-':
+            print("%s: %s" % (result['file'], result['detail']))
+
+    failures = len(results) - summary['ok']
+    report = {'license': expected,
+              'files': results,
+              'summary': summary,
+              'seconds': round(perf_counter() - started, 6)}
+
+    if args.report == '-':
+        print(json.dumps(report, indent=2))
+    else:
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2)
+        print("%d of %d file(s) passed." % (summary['ok'], len(results)))
+
+    return 1 if failures else 0
+
+def _check_file(filename, expected, args):
+    """Return the check status of one file, and a description of it"""
+    generator = Generator(filename, '', expected)
+    head = read_head(generator.out_file)
+
+    if head is None:
+        return ('missing', "No such file")
+
+    tag = spdx_id(head)
+    # SPDX ids are case insensitive
+    if tag and tag.casefold() == expected.casefold():
+        return ('ok', "Found SPDX tag for %s" % expected)
+
+    if not args.cpu_readable:
+        license_text = \
+            generator.fetch_license_header(args.verbatim_mode,
+                                           args.cpu_readable,
+                                           args.no_name,
+                                           args.no_anon)
+        if not license_text:
+            return ('error', "No license data for %s" % expected)
+
+        # without the license's terms, only an SPDX tag can be checked
+        if not generator.fetched:
+            if not tag:
+                return ('unavailable', "No license data for %s to check "
+                        "the header against" % expected)
+        elif matches_header(head, license_text):
+            return ('ok', "Found %s header" % expected)
+
+    if tag:
+        return ('wrong-license', "Expected %s, found SPDX tag for %s"
+                % (expected, tag))
+
+    if has_notice(head, generator.tokens):
+        return ('wrong-license', "Found a header without %s terms" % expected)
+
+    return ('no-header', "No license header")
+
+def _write_file(filename, args):
+    """Prepend a header to one file, returning a message to print, if any"""
+    generator = Generator(filename, '', args.short_name)
+
+    if args.update:
+        return _update_file(generator, args)
+
+    head = read_head(generator.out_file) if args.skip_existing else None
+
+    if head and has_notice(head, generator.tokens):
+        return None
+
+    license_text = \
+        generator.fetch_license_header(args.verbatim_mode,
+                                       args.cpu_readable,
+                                       args.no_name,
+                                       args.no_anon)
+    if not license_text:
+        raise IOError("Error writing file '%s'." % (generator.out_file))
+
+    if head is not None and not generator.fetched:
+        raise IOError("No license data for %s to compare with '%s'; left it "
+                      "unchanged." % (generator.rights.spdx_code,
+                                      generator.out_file))
+
+    if head and matches_header(head, license_text):
+        return None
+
+    if not _prepend(generator.out_file, license_text):
+        return "Created new %s file: %s" % (generator.lang, generator.out_file)
+
+    return None
+
+def _update_file(generator, args):
+    """
+    Update the year and license of the header at the top of an existing
+    file, leaving files without one untouched
+    """
+    text = read_head(generator.out_file, _UPDATE_HEAD_SIZE)
+    if text is None:
+        raise IOError("No such file: '%s'" % (generator.out_file))
+
+    license_text = \
+        generator.fetch_license_header(args.verbatim_mode,
+                                       args.cpu_readable,
+                                       args.no_name,
+                                       args.no_anon)
+    if not license_text:
+        raise IOError("Error writing file '%s'." % (generator.out_file))
+
+    # a header naming the license can't be told apart from its terms
+    if not generator.fetched:
+        raise IOError("No license data for %s; left '%s' unchanged."
+                      % (generator.rights.spdx_code, generator.out_file))
+
+    old_header = None
+    if len(generator.tokens) < 4 and \
+       license_changed(text, generator.tokens, license_text):
+        old_header = _render_old_header(generator, text, args)
+        if old_header is None:
+            raise ValueError("Can't identify the license of the header in "
+                             "'%s'; left it unchanged." % (generator.out_file))
+
+    update = update_header(text, generator.tokens, license_text,
+                           datetime.now().year, old_header)
+    if update is None:
+        return None
+
+    new_head, end = update
+    if '\ufffd' in text[:end]:
+        raise ValueError("Header of '%s' is not valid UTF-8" % (generator.out_file))
+
+    _prepend(generator.out_file, new_head, len(text[:end].encode('utf-8')))
+
+    return "Updated %s" % (generator.out_file)
+
+def _render_old_header(generator, text, args):
+    """
+    Identify the license of the header at the top of text, by its SPDX tag or
+    else by searching for its terms, and return a header for it rendered
+    like the one found, or None if there's no match
+    """
+    span = find_header(text, generator.tokens)
+    block = text[span[0]:span[1]]
+    tag = spdx_id(block)
+    candidates = [tag] if tag else search(' '.join(fingerprint(block)), limit=5)
+    styles = [(args.verbatim_mode, args.cpu_readable),
+              (not args.verbatim_mode, args.cpu_readable),
+              (args.verbatim_mode, not args.cpu_readable)]
+
+    for code in candidates:
+        try:
+            old = Generator(generator.out_file, '', code)
+        except ValueError:
+            continue
+
+        for full_text, cpu_readable in styles:
+            old_header = old.fetch_license_header(full_text, cpu_readable,
+                                                  args.no_name, args.no_anon)
+            if old_header and old.fetched and matches_header(block, old_header):
+                return old_header
+
+    return None
+
+@timed('write', lambda file_name, *args: {'file': file_name})
+def _prepend(file_name, header, offset=0):
+    """
+    Stream header, then the contents of file_name from the given offset, if
+    it exists, into a temporary file in the same directory, and move it into
+    place. The original is kept as file_name.bak, along with its
+    permissions. Returns True if the file existed
+    """
+    target = path.realpath(file_name)
+    fd, tmp_path = tempfile.mkstemp(dir=path.dirname(target), prefix='.tmp')
+
+    try:
+        with open(fd, 'wb') as tmp:
+            try:
+                with open(target, 'rb') as source:
+                    mode = os.fstat(source.fileno()).st_mode
+                    source.seek(offset)
+                    chunk = source.read(_CHUNK_SIZE)
+                    # match the file's line endings
+                    if b'\r\n' in chunk:
+                        header = re.sub(r'(?<!\r)\n', '\r\n', header)
+                    tmp.write(header.encode('utf-8'))
+                    # a UTF-8 header can't go on top of text in another
+                    # encoding: fail before anything is replaced
+                    decoder = getincrementaldecoder('utf-8')()
+                    try:
+                        while chunk:
+                            decoder.decode(chunk)
+                            tmp.write(chunk)
+                            chunk = source.read(_CHUNK_SIZE)
+                        decoder.decode(b'', final=True)
+                    except UnicodeDecodeError as exc:
+                        raise ValueError("'%s' is not valid UTF-8; left it "
+                                         "unchanged." % (file_name)) from exc
+                existed = True
+            except FileNotFoundError:
+                tmp.write(header.encode('utf-8'))
+                mode = _new_file_mode(tmp_path)
+                existed = False
+
+        os.chmod(tmp_path, stat.S_IMODE(mode))
+
+        if existed:
+            _backup(target, file_name + '.bak')
+
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return existed
+
+def _new_file_mode(tmp_path):
+    """
+    Return the permissions of a new file under the process umask, which the
+    kernel applies to a file created beside tmp_path; reading the umask
+    directly means changing it, for every thread
+    """
+    probe = tmp_path + '.mode'
+    fd = os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+
+    try:
+        return os.fstat(fd).st_mode
+    finally:
+        os.close(fd)
+        os.remove(probe)
+
+def _backup(file_name, backup_name):
+    """Link backup_name to the current contents of file_name"""
+    try:
+        os.remove(backup_name)
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.link(file_name, backup_name)
+    except OSError:
+        # no hard links on this file system
+        shutil.copy2(file_name, backup_name)
+
+def _run_jobs(func, items, jobs=1):
+    """
+    Yield func(item) for each item, in order, running up to the given
+    number of calls at once (all available cores if 0). The first call
+    runs alone to warm the shared license caches, and only a few calls
+    per worker are queued at a time, so items may be a lazy iterable
+    """
+    items = iter(items)
+    jobs = jobs or os.cpu_count() or 1
+
+    for item in islice(items, 1):
+        yield func(item)
+
+    if jobs == 1:
+        yield from map(func, items)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=jobs) as workers:
+        pending = deque(workers.submit(func, item)
+                        for item in islice(items, jobs * 4))
+        while pending:
+            result = pending.popleft().result()
+            for item in islice(items, 1):
+                pending.append(workers.submit(func, item))
+            yield result
+
+def _search(query):
+    """Print the licenses matching query, returning non-zero if there are none"""
+    names = license_names()
+    matches = search(query)
+
+    for code in matches:
+        print(('%-24s %s' % (code, names.get(code, ''))).rstrip())
+
+    return 0 if matches else 1
+
+def _prefetch(spdx_ids):
+    """Fill the license cache, returning a non-zero status on failure"""
+    def _report(done, total, resource_name, status):
+        print('[%*d/%d] %-7s %s' % (len(str(total)), done, total, status,
+                                   resource_name),
+              file=sys.stderr)
+
+    summary = prefetch(None if 'all' in spdx_ids else spdx_ids,
+                       progress=_report)
+    print("Fetched %d file(s), %d already cached, %d failed."
+          % (len(summary['fetched']), len(summary['cached']),
+             len(summary['failed'])))
+
+    for resource_name in summary['failed']:
+        print("  failed: %s" % resource_name)
+
+    return 1 if summary['failed'] else 0
+
+def _build_archive(archive_path):
+    """Bundle the license cache into an archive file"""
+    count = archive.build(archive_path, cache.entries(), cache.names())
+    print("Wrote %d license file(s) to %s" % (count, archive_path))
+
+    return 0 if count else 1
+
+_CHUNK_SIZE = 64 * 1024
+"""
+Number of bytes copied at a time when rewriting a file
+"""
+
+_CHECK_STATUSES = ('ok', 'no-header', 'wrong-license', 'missing',
+                   'unavailable', 'error')
+"""
+Possible outcomes of checking a file with --check
+"""
+
+_UPDATE_HEAD_SIZE = 256 * 1024
+"""
+Number of bytes searched for a header to update, enough for the full text
+of any license
+"""
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+"""
+Detection of license headers already present in source files
+"""
+import re
+
+__all__ = ['find_header', 'fingerprint', 'has_notice', 'license_changed',
+           'matches_header', 'read_head', 'spdx_id', 'update_header']
+
+
+def read_head(file_name, size=None):
+    """
+    Return the first size bytes (by default, a few KB) of a file as text, or
+    None if the file doesn't exist
+    """
+    try:
+        with open(file_name, 'rb') as source:
+            return source.read(size or _HEAD_SIZE).decode('utf-8', 'replace')
+    except FileNotFoundError:
+        return None
+
+def has_notice(head, tokens):
+    """
+    Return True if the given text has an SPDX tag, or a copyright notice in
+    a comment delimited by the given tokens
+    """
+    return bool(_SPDX_TAG_RE.search(head) or _notice_re(tokens).search(head))
+
+def matches_header(head, header):
+    """Return True if the given text contains the terms of a rendered header"""
+    lines = fingerprint(header)
+    return bool(lines) and all(line in head for line in lines)
+
+def fingerprint(header, size=3):
+    """
+    Return the first few lines of license terms in a rendered header, which
+    identify it whatever the year, author or file name
+    """
+    lines = [line.strip() for line in header.splitlines()]
+    for pos, line in enumerate(lines):
+        if _COPYRIGHT_RE.search(line):
+            lines = lines[pos + 1:]
+            break
+
+    return tuple(line for line in lines if len(line.split()) > 2)[:size]
+
+def spdx_id(head):
+    """Return the license id of the first SPDX tag in the given text, if any"""
+    tag = _SPDX_ID_RE.search(head)
+    return tag.group(1) if tag else None
+
+def find_header(text, tokens, paragraphs=None):
+    """
+    Return the start and end offsets of the comment block at the top of text,
+    after any shebang, encoding declaration or markup directive, if it holds
+    a copyright notice or SPDX tag; otherwise None. Nothing marks the end of
+    a header in line comments, so if paragraphs is given, the block ends
+    after that many paragraphs of license terms following the notice
+    """
+    lines = text.splitlines(keepends=True)
+    start = 0
+    pos = 0
+
+    while pos < len(lines) and _PREAMBLE_RE.match(lines[pos]):
+        start += len(lines[pos])
+        pos += 1
+
+    opener = tokens[0].strip()
+    end = start
+
+    if len(tokens) < 4:
+        while pos < len(lines) and lines[pos].lstrip().startswith(opener):
+            end += len(lines[pos])
+            pos += 1
+
+        if paragraphs is not None:
+            end = _terms_end(text, start, end, opener, paragraphs)
+    else:
+        opener = opener.rstrip(opener[-1]) + opener[-1]
+        if pos == len(lines) or not lines[pos].lstrip().startswith(opener):
+            return None
+
+        closer = text.find(tokens[3].strip(),
+                           text.index(opener, start) + len(opener))
+        if closer < 0:
+            return None
+
+        end = text.find('\n', closer)
+        end = len(text) if end < 0 else end + 1
+
+    block = text[start:end]
+    if not (_NOTICE_RE.search(block) or _SPDX_ID_RE.search(block)):
+        return None
+
+    return (start, end)
+
+def license_changed(text, tokens, header):
+    """
+    Return True if the header at the top of text is for another license
+    than the given rendered header
+    """
+    span = find_header(text, tokens)
+    return span is not None and not _same_license(text[span[0]:span[1]], header)
+
+def update_header(text, tokens, header, year, old_header=None):
+    """
+    Bring the header at the top of text up to date with a newly rendered
+    one: extend the year range of its copyright notice to the given year,
+    and replace its license terms if they differ, keeping the notice.
+    Returns the new text up to the end of the header, and the offset in text
+    where the header ends, or None if there's no header or nothing to change.
+    Nothing marks the end of a header in line comments, so replacing one
+    takes old_header, a rendering of the license it's for, to show where it
+    ends; without it, ValueError is raised
+    """
+    span = find_header(text, tokens)
+    if span is None:
+        return None
+
+    new_span = find_header(header, tokens)
+    same_license = _same_license(text[span[0]:span[1]], header)
+
+    if len(tokens) < 4:
+        # keep any comments following the header
+        if same_license:
+            model = header
+        elif old_header is not None:
+            model = old_header
+        else:
+            raise ValueError("Can't tell where the old license terms end")
+
+        model_span = find_header(model, tokens)
+        span = find_header(text, tokens,
+                           _count_paragraphs(model, model_span,
+                                             tokens[0].strip())
+                           if model_span else None)
+
+    start, end = span
+    block = _bump_year(text[start:end], year)
+
+    if new_span and not same_license:
+        old_notice = _NOTICE_RE.search(block)
+        block = header[new_span[0]:new_span[1]]
+        if old_notice:
+            block = _NOTICE_RE.sub(lambda new: new.group(1) + new.group(2) +
+                                   old_notice.group(3),
+                                   block, count=1)
+
+    if block == text[start:end]:
+        return None
+
+    return (text[:start] + block, end)
+
+def _paragraph_ends(text, start, end, opener):
+    """
+    Return the offset after each blank comment line closing a paragraph of
+    the block text[start:end], from the one holding the copyright notice on
+    """
+    ends = []
+    notice = _NOTICE_RE.search(text, start, end)
+    if not notice:
+        return ends
+
+    pos = text.rfind('\n', start, notice.start()) + 1
+    in_paragraph = False
+
+    for line in text[pos:end].splitlines(keepends=True):
+        pos += len(line)
+        blank = line.strip() == opener
+        if blank and in_paragraph:
+            ends.append(pos)
+        in_paragraph = not blank
+
+    return ends
+
+def _terms_end(text, start, end, opener, paragraphs):
+    """
+    Return the offset after the blank comment line closing the given number
+    of paragraphs after the copyright notice, or end if there are fewer
+    """
+    ends = _paragraph_ends(text, start, end, opener)
+    return ends[paragraphs] if len(ends) > paragraphs else end
+
+def _count_paragraphs(header, span, opener):
+    """Return the number of paragraphs after the notice in a rendered header"""
+    return max(0, len(_paragraph_ends(header, span[0], span[1], opener)) - 1)
+
+def _bump_year(block, year):
+    """Extend the first copyright notice in block to cover the given year"""
+    notice = _NOTICE_RE.search(block)
+    if not notice:
+        return block
+
+    years = _YEARS_RE.match(notice.group(3))
+    first, last = int(years.group(1)), int(years.group(2) or years.group(1))
+    if last >= year:
+        return block
+
+    return block[:notice.start(3)] + '%d-%d' % (first, year) + \
+        block[notice.start(3) + years.end():]
+
+def _same_license(block, header):
+    """Return True if a header block has the same license as a new header"""
+    old_id = _SPDX_ID_RE.search(block)
+    new_id = _SPDX_ID_RE.search(header)
+
+    if old_id or new_id:
+        return bool(old_id and new_id) and \
+            old_id.group(1).casefold() == new_id.group(1).casefold()
+
+    return matches_header(block, header)
+
+def _notice_re(tokens):
+    """
+    Return a pattern matching a copyright notice in a comment: on a line
+    starting with a line comment token, or between block comment tokens
+    """
+    pattern = _NOTICE_PATTERNS.get(tokens)
+
+    if pattern is None:
+        opener = tokens[0].strip()
+        if len(tokens) < 4:
+            pattern = re.compile(r'^[ \t]*%s.*\bcopyright\b' % re.escape(opener),
+                                 re.IGNORECASE | re.MULTILINE)
+        else:
+            # let '/*' open a block as well as '/**', etc.
+            opener = opener.rstrip(opener[-1]) + opener[-1]
+            closer = tokens[3].strip()
+            pattern = re.compile(r'%s(?:(?!%s).)*?\bcopyright\b'
+                                 % (re.escape(opener), re.escape(closer)),
+                                 re.IGNORECASE | re.DOTALL)
+        _NOTICE_PATTERNS[tokens] = pattern
+
+    return pattern
+
+_HEAD_SIZE = 8192
+"""
+Number of bytes read from the start of a file when looking for a header
+"""
+
+_SPDX_TAG_RE = re.compile(r'SPDX-(License-Identifier|FileCopyrightText):')
+
+_COPYRIGHT_RE = re.compile(r'\bcopyright\b', re.IGNORECASE)
+
+_NOTICE_RE = re.compile(r'(Copyright(?: \([cC]\))?|SPDX-FileCopyrightText:)'
+                        r'([ \t]+)(\d{4}[^\r\n]*)')
+"""
+A copyright notice as written by the Generator type: the keyword, spacing,
+then the years and copyright holder
+"""
+
+_YEARS_RE = re.compile(r'(\d{4})(?:[ \t]*-[ \t]*(\d{4}))?')
+
+_SPDX_ID_RE = re.compile(r'SPDX-License-Identifier:[ \t]*([^\s*]+)')
+
+_PREAMBLE_RE = re.compile(r'^(?:[ \t]*\r?\n|[ \t]*#!|#.*coding|[ \t]*<[?!](?!--))')
+"""
+Lines that may come before a header: blank lines, shebangs, encoding
+declarations, and PHP or XML directives
+"""
+
+_NOTICE_PATTERNS = {}
+"""
+Compiled copyright notice patterns, keyed by comment tokens
+"""
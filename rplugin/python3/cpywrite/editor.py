@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""
+Buffer manipulation functions shared by the Vim and Neovim front ends
+"""
+import os
+import re
+from cpywrite.generator import Generator, _get_source_author
+from cpywrite.spdx.license import License
+from cpywrite.timing import timed
+
+__all__ = ['insert_header', 'make_generator', 'read_snapshot',
+           'snapshot_expr']
+
+
+def make_generator(filename, filetype, license_name, commentstring=''):
+    """
+    Return a Generator for a buffer with the given name and file type,
+    falling back to the buffer's 'commentstring' when the language isn't
+    recognized. Returns None if there's no way to comment the buffer
+    """
+    try:
+        generator = Generator(filename, filetype, license_name)
+
+        if (filename.endswith('.pl') and filetype == 'prolog'):
+            generator.set_file_props(filename.replace('.pl', '.p'), filetype)
+            generator.out_file = filename
+
+        return generator
+    except ValueError: # try falling back to buffer's file type attributes
+        tokens = list(map(str.strip, commentstring.split('%s')))
+        if not tokens or not tokens[0]:
+            return None
+
+        generator = Generator(os.path.splitext(filename)[0])
+        if len(tokens) == 1 or not tokens[1]:
+            generator.tokens = (tokens[0], tokens[0] + '\x20')
+        else:
+            generator.tokens = (tokens[0], '\x20', '\x20', tokens[1])
+        generator.rights = License(license_name)
+        generator.lang = filetype
+        generator.out_file = filename
+
+        return generator
+
+def snapshot_expr(license_expr):
+    """
+    Return a Vim expression for a dict of everything needed to write a header
+    into the current buffer: its name, syntax, 'commentstring' and cursor,
+    the boolean g:cpywrite# options, and the license named by license_expr.
+    Evaluating it reads them all in one call
+    """
+    return _SNAPSHOT_EXPR % license_expr
+
+def read_snapshot(snapshot):
+    """
+    Validate the result of evaluating snapshot_expr(), whose numbers may be
+    strings. Returns a copy with each option converted to a bool, and the
+    cursor to a (row, column) pair, along with the names of any options not
+    set to a number, which are taken to be off
+    """
+    state = dict(snapshot)
+    state['options'] = {}
+    invalid = []
+
+    for name in _FLAGS:
+        try:
+            state['options'][name] = \
+                bool(int(str(snapshot['options'][name]), 10))
+        except (KeyError, ValueError):
+            state['options'][name] = False
+            invalid.append(name)
+
+    state['cursor'] = tuple(int(str(pos), 10) for pos in snapshot['cursor'])
+
+    return (state, invalid)
+
+@timed('insert')
+def insert_header(curr_buffer, header, filetype, filename,
+                  preserve_shebangs=True, include_javadoc=False):
+    """
+    Splice a license header into a buffer, making room for any existing
+    shebangs, encoding declarations or markup directives
+    """
+    to_trim = 0
+    to_skip = 0
+    offset = 0
+
+    # directives only matter at the top of a file, so read no further, and
+    # read it all in one call: each line fetched costs a round trip to Vim
+    for line in curr_buffer[0:_SCAN_LINES]:
+        curr_line = line.lstrip()
+        is_script = curr_line.startswith("#!", 0) or \
+                _ENCODING_RE.match(curr_line)
+        # replace shebang lines and encoding declarations, if any
+        if not preserve_shebangs and is_script:
+            to_trim += 1
+        # don't replace:
+        # - encoding or doctype declarations in [X|HT]ML,or
+        # - existing PHP markup
+        # - Batch directives
+        elif _MARKUP_OPEN_RE.match(curr_line) or \
+            _MARKUP_CLOSE_RE.match(line.rstrip()) or \
+            (filetype == 'dosbatch' and curr_line.startswith('@', 0)):
+            offset += 2
+        elif preserve_shebangs and is_script:
+            offset = (offset + 1) if len(curr_line) > 0 else offset
+            # make an exception for Ruby because we don't insert a shebang,
+            # and never will: it upsets rubocop if the exec perm flag is not
+            # set; the `--safe-auto-correct` option will actually *make* the
+            # file executable(!)
+            # https://docs.rubocop.org/rubocop/cops_lint.html#lintscriptpermission
+            to_skip = (to_skip + 1) if filetype != 'ruby' else to_skip
+
+    if include_javadoc:
+        _add_author_tag(curr_buffer, os.path.splitext(filename)[0])
+
+    if to_trim > 0:
+        del curr_buffer[0:to_trim]
+
+    curr_buffer[offset:offset] = header.splitlines()[to_skip:]
+
+def _add_author_tag(curr_buffer, class_name):
+    """
+    Add an @author tag to the first blank line of the doc comment above the
+    declaration of the given class, if there is one. Lines are read in
+    growing slices, stopping at the declaration
+    """
+    declaration = re.compile(r'\b(class|interface|enum|record)\s+%s\b'
+                             % re.escape(class_name))
+    lines = []
+    class_line = None
+
+    while class_line is None and class_name:
+        start = len(lines)
+        chunk = curr_buffer[start:start + max(_SCAN_LINES, start)]
+        if not chunk:
+            return
+
+        for pos, line in enumerate(chunk, len(lines)):
+            if declaration.search(line):
+                class_line = pos
+                break
+
+        lines.extend(chunk)
+
+    if class_line is None:
+        return
+
+    class_doc = class_line
+    while class_doc > 0 and lines[class_doc].find('/**') == -1:
+        class_doc -= 1
+
+    # insert tag into existing doc comment only
+    if lines[class_doc].find('/**') == -1:
+        return
+
+    for pos in range(class_doc + 1, class_line):
+        docline = lines[pos]
+        if _DOC_CLOSE_RE.match(docline):
+            break
+
+        # doc line must be blank
+        if _BLANK_DOC_RE.match(docline):
+            author, email = _get_source_author()
+            email = re.sub(r'\<', '&lt;', re.sub(r'\>', '&gt;', email))
+            curr_buffer[pos:pos] = \
+                [docline, '%s @author %s %s' % (docline, author, email)]
+            break
+
+_FLAGS = ['machine_readable', 'verbatim_mode', 'hide_filename',
+          'no_anonymous', 'preserve_shebangs', 'java#add_class_doc']
+"""
+Names of the boolean g:cpywrite# options
+"""
+
+_SNAPSHOT_EXPR = "{'filename': expand('%%:t'), 'filetype': &syntax, " \
+    "'commentstring': &commentstring, 'cursor': [line('.'), col('.') - 1], " \
+    "'license_name': %s, 'options': {" + \
+    ', '.join("'%s': get(g:, 'cpywrite#%s', 0)" % (name, name)
+              for name in _FLAGS) + \
+    "}}"
+"""
+A dict of the buffer attributes and options used to write a header, with a
+slot for the license name; unset options are 0
+"""
+
+_SCAN_LINES = 64
+"""
+Number of lines at the top of a buffer searched for shebangs, encoding
+declarations and markup directives
+"""
+
+_ENCODING_RE = re.compile(r'^#.+(coding).+$')
+
+_MARKUP_OPEN_RE = re.compile(r'^\<[\?!]\w*')
+
+_MARKUP_CLOSE_RE = re.compile(r'\?*\>$')
+
+_DOC_CLOSE_RE = re.compile(r'^\s*.*\*\/')
+
+_BLANK_DOC_RE = re.compile(r'^\s*\*+\s*$')
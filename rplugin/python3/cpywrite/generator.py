@@ -5,13 +5,13 @@ Module providing a file writer
 """
 import re
 import sys
-from datetime import datetime
 from io import StringIO
-from itertools import chain
-from os import path, environ
-from platform import system
-from subprocess import check_output, CalledProcessError
+from os import getcwd, path, environ, stat
+from threading import Lock
+from time import strftime
+from cpywrite.spdx.cache import LRUCache
 from cpywrite.spdx.license import License, in_pub_domain
+from cpywrite.timing import timed
 
 __all__ = ['Generator', 'extensions']
 
@@ -19,6 +19,7 @@ __all__ = ['Generator', 'extensions']
 class Generator():
     """A source file generator"""
     def __init__(self, filename='new.py', vim_filetype='python', rights='Apache-2.0'):
+        self.fetched = False
         self.set_file_props(filename, vim_filetype, rights)
 
     def set_file_props(self, filename, filetype='', rights=''):
@@ -37,9 +38,16 @@ class Generator():
         self.lang = lang
         self.tokens = tokens
 
+    @timed('render', lambda self, *args, **kwargs: {
+        'license': self.rights.spdx_code, 'file': path.basename(self.out_file)})
     def fetch_license_header(self, full_text=False, cpu_readable=False,
-                             no_name=False, no_anon=False):
-        """Return a license header, with or without standard language"""
+                             no_name=False, no_anon=False, messages=None):
+        """
+        Return a license header, with or without standard language. Errors
+        are written to messages, if given, or else stdout. If the license's
+        terms can't be found, the header only names the license, and the
+        fetched attribute is set to False
+        """
         def _continue_block_comment(dest):
             try:
                 tkn = self.tokens[2]
@@ -102,8 +110,29 @@ class Generator():
 
         try:
             out = StringIO()
-            year = str(datetime.now())[:4]
+            year = strftime('%Y')
             author, contact = _get_source_author()
+            slots = {_FILE_NAME_SLOT: path.basename(self.out_file),
+                     _YEAR_SLOT: year,
+                     _AUTHOR_SLOT: author,
+                     _CONTACT_SLOT: contact}
+            # headers differ only in their slots when everything else is equal
+            template_key = (self.rights.spdx_code, self.rights.header_width,
+                            self.lang_key, self.tokens,
+                            full_text, cpu_readable, no_name, no_anon,
+                            bool(author), bool(contact))
+            template = _HEADER_TEMPLATES.get(template_key)
+
+            if template is not None:
+                self.fetched = True
+                return _fill(template, slots)
+
+            # render with placeholders, so that the result can be filled in
+            # for any year, author or file name
+            year = _YEAR_SLOT
+            author = _AUTHOR_SLOT if author else ''
+            contact = _CONTACT_SLOT if contact else ''
+
             # use the tag prefix specified by REUSE
             # https://reuse.software/spec/#comment-headers
             copying = \
@@ -122,6 +151,10 @@ class Generator():
             else:
                 terms = self.rights.header
 
+            # an empty string means the license could not be fetched
+            fetched = terms != ''
+            self.fetched = fetched
+
             # Replace historical copyrights only when deemed optional by the SPDX,
             # e.g. https://spdx.org/licenses/0BSD.html
             # This prevents faulty matches with the FSF ZIP code in the GPL v1 and 2
@@ -137,14 +170,14 @@ class Generator():
             author_date = re.compile(author_date_re, re.IGNORECASE)
 
             if self.lang_key in _SCRIPT_HEADERS:
-                print(_SCRIPT_HEADERS[self.lang_key], file=out)
+                print(_script_header(self.lang_key), file=out)
             elif self.tokens[0].startswith('"'):
                 terms = [ln.replace('"', '\'') for ln in terms]
 
             print(self.tokens[0], file=out)
 
             if not no_name:
-                print(self.tokens[1] + path.basename(self.out_file), file=out)
+                print(self.tokens[1] + _FILE_NAME_SLOT, file=out)
                 _continue_block_comment(out)
 
             if ''.join(terms).strip():  # found a standard header
@@ -187,12 +220,16 @@ class Generator():
                     print(self.tokens[1] + str(self.rights), file=out)
 
             _close_block_comment(out)
+            template = tuple(_SLOTS_RE.split(out.getvalue()))
+
+            if fetched:
+                _HEADER_TEMPLATES.put(template_key, template)
 
-            return out.getvalue()
+            return _fill(template, slots)
 
         except (AttributeError, IndexError, IOError, KeyError, ValueError) \
                 as exc:
-            print(str(exc))
+            print(str(exc), file=messages)
         finally:
             out.close()
 
@@ -211,25 +248,25 @@ class Generator():
 
 def extensions():
     """Return a list of file extensions recognized by the Generator type"""
-    return sorted('*' + e for e in \
-                  filter(len,
-                         set(chain(
-                             (l.lower() for l in _SOURCE_META
-                              if not l[0] == '.' for l in l),
-                             (lang.lower() for lang in _SOURCE_META
-                              if lang[0] == '.')))))
+    return list(_EXTENSIONS)
+
+def _fill(template, slots):
+    """Return a header template with its slots replaced by the given values"""
+    return ''.join(slots.get(part, part) for part in template)
 
 def _get_language_meta(filename, filetype=''):
     """Identify programming language from file extension or Vim file type"""
     if not bool(filename.strip()) or \
-        re.match(r'^.*[`<>:\"\'\|\?\*].*$', filename) or \
-            re.match(r'^.+[\-`<>:\"\'\|\?\*\.]+$', filename):
+        _INVALID_CHARS_RE.match(filename) or \
+            _INVALID_ENDING_RE.match(filename):
         raise ValueError("Invalid filename: '%s'" % filename)
 
     fname, ext = path.splitext(filename)
 
-    if fname.startswith('.'):
-        if 'vim' in fname.lower() or fname.lower().endswith('exrc'):
+    base_name = path.basename(fname).lower()
+
+    if base_name.startswith('.'):
+        if 'vim' in base_name or base_name.endswith('exrc'):
             return ('VimL', '', ('""', '"" '))
 
         if filetype == 'xdefaults':
@@ -238,83 +275,175 @@ def _get_language_meta(filename, filetype=''):
         if not filetype:
             return ('dot', '', ('#', '# '))
 
-    if path.basename(fname).lower() in ['dockerfile', 'make', 'makefile', 'gnumakefile']:
+    if base_name in _SPECIAL_FILE_NAMES:
         return (path.basename(fname).capitalize(), '', ('#', '# '))
 
-    if ext.lower() == '.txt' and \
-       path.basename(fname).lower().startswith('cmake'):
+    if ext.lower() == '.txt' and base_name.startswith('cmake'):
         return ('CMake', '.txt', ('#', '# '))
 
-    lang = ''
-    tokens = ()
     ext = ext.lower()
 
-    for fexts, ftype in _SOURCE_META.items():
-        if not ext and filetype:
-            meta = list(filter(lambda attrs: attrs.get(filetype.lower()),
-                        ({ name.lower() : ftype[1] } for _, name in ftype[0].items())))
-            if meta:
-                lang, tokens = list(*meta[0].items())
-                return (lang, ext, tokens)
+    if not ext and filetype:
+        meta = _FILETYPE_INDEX.get(filetype.lower())
+        if meta:
+            return (meta[0], ext, meta[1])
+
+    lang, tokens = _EXTENSION_INDEX.get(ext, ('', ()))
+
+    return (lang, ext, tokens)
 
+def _index_extensions():
+    """Map each file extension in _SOURCE_META to a language and its tokens"""
+    index = {}
+
+    for fexts, ftype in _SOURCE_META.items():
         # keys of only one element will get expanded into a char sequence
         exts = [fexts] if fexts[0] == '.' else fexts
-        if ext in exts:
-            try:
-                for grp in ftype[0]:
-                    if (ext in grp and not grp[0] == '.') or \
-                       (ext == grp and grp[0] == '.'):
-                        lang = ftype[0][grp]
-                        tokens = ftype[1]
-                        break
-
-            except (KeyError, IndexError):
-                pass
+        for ext in exts:
+            for grp in ftype[0]:
+                if (ext in grp and not grp[0] == '.') or \
+                   (ext == grp and grp[0] == '.'):
+                    index[ext] = (ftype[0][grp], ftype[1])
+                    break
 
-    return (lang, ext, tokens)
+    return index
 
+def _index_filetypes():
+    """
+    Map the lowercase name of each language in _SOURCE_META to itself and
+    its tokens, for matching Vim file types
+    """
+    index = {}
+
+    for ftype in _SOURCE_META.values():
+        for name in ftype[0].values():
+            index.setdefault(name.lower(), (name.lower(), ftype[1]))
+
+    return index
+
+@timed('author')
 def _get_source_author():
     """
     Retrieve author details from local git configuration
     """
     author = \
         environ.get('USERNAME', 'unknown') \
-        if system() == 'Windows' \
+        if sys.platform == 'win32' \
         else environ.get('USER', 'unknown')
-    email = 'domain.org'
-    git_username = author
+    git_username, email = _get_git_identity()
+
+    if git_username is None:
+        git_username = author
 
+    if email is None:
+        from platform import node
+        host = node()
+        email = author + '@' + host if host else 'domain.org'
+
+    if bool(git_username):
+        author = git_username
+        email = ' <' + email + '>' if email else ''
+
+    return (author, email)
+
+def _get_git_identity():
+    """
+    Return the user.name and user.email of the current repository, reading
+    them with one git command the first time, and again only if a config
+    file has been modified since. Unset values are None
+    """
+    repo_root = _find_repo_root(getcwd())
+    stamp = tuple(map(_mtime, _git_config_files(repo_root)))
+
+    with _LOCK:
+        cached = _GIT_IDENTITIES.get(repo_root)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+    import subprocess
+    identity = {}
     try:
-        git_username = check_output(['git',
-                                     'config',
-                                     '--get',
-                                     'user.name']).decode('utf-8').rstrip()
+        output = subprocess.check_output(['git', 'config', '--get-regexp',
+                                          r'^user\.(name|email)$'],
+                                         stderr=subprocess.DEVNULL
+                                         ).decode('utf-8')
 
-    except (IOError, OSError, CalledProcessError, AttributeError):
+        for line in output.splitlines():
+            key, _, value = line.partition(' ')
+            identity[key.lower()] = value.rstrip()
+
+    except (IOError, OSError, subprocess.CalledProcessError, AttributeError):
         pass
 
-    try:
-        email = check_output(['git',
-                              'config',
-                              '--get',
-                              'user.email']).decode('utf-8').rstrip()
+    identity = (identity.get('user.name'), identity.get('user.email'))
 
-    except (IOError, OSError, CalledProcessError, AttributeError):
-        try:
-            email = author + '@' + \
-                    check_output(['hostname']
-                                 if system() == 'Windows'
-                                 else ['uname', '-n']
-                                ).decode('utf-8').rstrip()
+    with _LOCK:
+        _GIT_IDENTITIES[repo_root] = (stamp, identity)
 
-        except (IOError, OSError, CalledProcessError, AttributeError):
-            pass
+    return identity
 
-    if bool(git_username):
-        author = git_username
-        email = ' <' + email + '>' if email else ''
+def _script_header(lang_key):
+    """Return the lines that open a new script in the given language"""
+    if lang_key == 'shell script':
+        return _SCRIPT_HEADERS[lang_key] \
+            % re.sub(r'^\$\w+', 'bash', path.expandvars('$SHELL').split('/')[-1])
 
-    return (author, email)
+    return _SCRIPT_HEADERS[lang_key]
+
+def _find_repo_root(directory):
+    """Return the nearest directory containing a .git entry, or ''"""
+    while True:
+        if path.exists(path.join(directory, '.git')):
+            return directory
+
+        parent = path.dirname(directory)
+        if parent == directory:
+            return ''
+        directory = parent
+
+def _git_config_files(repo_root):
+    """Return the config files git would read in the given repository"""
+    home = path.expanduser('~')
+    files = [
+        environ.get('GIT_CONFIG_SYSTEM', '/etc/gitconfig'),
+        environ.get('GIT_CONFIG_GLOBAL', path.join(home, '.gitconfig')),
+        path.join(environ.get('XDG_CONFIG_HOME') or path.join(home, '.config'),
+                  'git', 'config')]
+
+    if repo_root:
+        git_dir = path.join(repo_root, '.git')
+
+        # linked worktrees and submodules have a file pointing to their git
+        # directory; a worktree's also names the directory it shares config
+        # with, relative to itself
+        if path.isfile(git_dir):
+            try:
+                with open(git_dir, encoding='utf-8') as link:
+                    git_dir = path.join(
+                        repo_root,
+                        link.read().partition('gitdir:')[2].strip())
+            except (IOError, OSError):
+                pass
+
+            files.append(path.join(git_dir, 'config.worktree'))
+
+            try:
+                with open(path.join(git_dir, 'commondir'),
+                          encoding='utf-8') as common:
+                    git_dir = path.join(git_dir, common.read().strip())
+            except (IOError, OSError):
+                pass
+
+        files.append(path.join(git_dir, 'config'))
+
+    return files
+
+def _mtime(file_name):
+    try:
+        info = stat(file_name)
+        return (file_name, info.st_mtime_ns, info.st_size)
+    except (IOError, OSError):
+        return (file_name, None, None)
 
 _SOURCE_META = {
     ('', '.cmake', '.dockerfile', '.ex', '.exs', '.jl', '.mk', '.mak','.pl', '.py', '.pyw',
@@ -432,11 +561,67 @@ Mapping of file extensions to comment markers for all programming languages
 recognized by the Generator type
 """
 
+_EXTENSION_INDEX = _index_extensions()
+"""
+Language name and comment tokens of each recognized file extension
+"""
+
+_FILETYPE_INDEX = _index_filetypes()
+"""
+Language name and comment tokens of each recognized Vim file type
+"""
+
+_EXTENSIONS = tuple(sorted('*' + ext for ext in _EXTENSION_INDEX if ext))
+"""
+Glob patterns of all recognized file extensions
+"""
+
+_SPECIAL_FILE_NAMES = frozenset(['dockerfile', 'make', 'makefile', 'gnumakefile'])
+"""
+Lowercase names of extensionless build files
+"""
+
+_INVALID_CHARS_RE = re.compile(r'^.*[`<>:\"\'\|\?\*].*$')
+
+_INVALID_ENDING_RE = re.compile(r'^.+[\-`<>:\"\'\|\?\*\.]+$')
+
+_HEADER_TEMPLATES = LRUCache(maxsize=128)
+"""
+Recently generated headers, split into literal text and slots
+"""
+
+_FILE_NAME_SLOT = '\0'
+"""
+Placeholder for the file name in a generated header
+"""
+
+_YEAR_SLOT = '\U00010330'
+
+_AUTHOR_SLOT = '\U00010331'
+"""
+Placeholders for the year and author in a generated header: letters that
+never occur in license text, which the patterns fixing up copyright notices
+treat like the words they stand for
+"""
+
+_CONTACT_SLOT = '\1'
+"""
+Placeholder for the author's email address, if any, in a generated header
+"""
+
+_SLOTS_RE = re.compile('([%s%s%s%s])' % (_FILE_NAME_SLOT, _YEAR_SLOT,
+                                        _AUTHOR_SLOT, _CONTACT_SLOT))
+
+_GIT_IDENTITIES = {}
+"""
+The git user.name and user.email of each repository root seen so far,
+stamped with the modification times of the config files they came from
+"""
+
+_LOCK = Lock()
+
 _SCRIPT_HEADERS = {
-    'shell script': '#!/usr/bin/env %s'
-                    % re.sub(r'^\$\w+',
-                             'bash',
-                             path.expandvars('$SHELL').split('/')[-1]),
+    'shell script': '#!/usr/bin/env %s',
     'perl': '#!/usr/bin/env perl',
     'php': '<?php',
     'python': '#!/usr/bin/env python%s\n# -*- coding: utf-8 -*-\n'
@@ -444,5 +629,6 @@ _SCRIPT_HEADERS = {
     'ruby': '# frozen_string_literal: true\n',
 }
 """
-Header lines for the most common scripting languages
+Header lines for the most common scripting languages; the name of the
+user's shell is filled in when a shell script header is rendered
 """
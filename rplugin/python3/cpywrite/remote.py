@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+Neovim remote plugin, registered by :UpdateRemotePlugins
+"""
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+import json
+import pynvim
+from cpywrite.editor import (insert_header, make_generator, read_snapshot,
+                             snapshot_expr)
+from cpywrite.timing import enable, enabled, records
+
+__all__ = ['CPYwritePlugin']
+
+
+@pynvim.plugin
+class CPYwritePlugin():
+    """
+    Fetches and renders license headers on a worker thread of a long-lived
+    host, so the editor stays responsive, and caches stay warm between calls
+    """
+    def __init__(self, nvim):
+        self.nvim = nvim
+        self._worker = ThreadPoolExecutor(max_workers=1)
+        if enabled():
+            # the host's stderr isn't shown to the user; see stats()
+            enable(echo=False)
+
+    @pynvim.function('CPYwriteAsync')
+    def prepend_async(self, args):
+        """Prepend a license header to the current buffer when it's ready"""
+        curr_buffer = self.nvim.current.buffer
+        state, invalid = read_snapshot(self.nvim.eval(snapshot_expr(
+            "get(g:, 'cpywrite#default_license', 'Apache-2.0')")))
+
+        if args and args[0]:
+            state['license_name'] = args[0]
+
+        for name in invalid:
+            self.nvim.err_write("'g:cpywrite#%s' should be set to a number!\n"
+                                % name)
+
+        self._worker.submit(self._render,
+                            curr_buffer,
+                            state['filename'],
+                            state['filetype'],
+                            state['license_name'],
+                            state['commentstring'],
+                            state['options'])
+
+    @pynvim.function('CPYwriteAsyncStats', sync=True)
+    def stats(self, args):  # pylint: disable=W0613
+        """Return the phases most recently timed by the host, as JSON"""
+        return [json.dumps(entry) for entry in records()]
+
+    def _render(self, curr_buffer, filename, filetype, license_name,
+                commentstring, options):
+        """Generate a header, then schedule its insertion on the event loop"""
+        # stdout is the RPC channel: collect anything the Generator reports
+        messages = StringIO()
+
+        try:
+            writer = make_generator(filename, filetype, license_name,
+                                    commentstring)
+            header = writer.fetch_license_header(options['verbatim_mode'],
+                                                 options['machine_readable'],
+                                                 options['hide_filename'],
+                                                 options['no_anonymous'],
+                                                 messages) \
+                if writer else None
+        except ValueError as exc:
+            messages.write(str(exc) + '\n')
+            header = None
+        except Exception as exc:  # pylint: disable=W0703
+            # anything else would be lost in the worker's Future
+            messages.write('Error writing header: %r\n' % (exc,))
+            header = None
+
+        if messages.getvalue():
+            self.nvim.async_call(self.nvim.err_write, messages.getvalue())
+
+        if header:
+            self.nvim.async_call(self._insert, curr_buffer, header, filetype,
+                                 filename, options)
+
+    def _insert(self, curr_buffer, header, filetype, filename, options):
+        if not curr_buffer.valid:
+            return
+
+        try:
+            insert_header(curr_buffer, header, filetype, filename,
+                          options['preserve_shebangs'],
+                          options['java#add_class_doc'])
+        except (ValueError, pynvim.NvimError) as exc:
+            self.nvim.err_write(str(exc) + '\n')
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""
+A read-only, single-file bundle of license data for offline use.
+
+The file begins with an 8-byte signature, followed by the offset and
+length of an index, stored as little-endian unsigned integers. Each
+license resource is stored as a zlib-compressed blob; the index maps
+cache keys (see cpywrite.spdx.cache.entry_key) to the offset and length
+of each blob
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from threading import Lock
+from cpywrite.spdx.cache import entry_key
+
+__all__ = ['LicenseArchive', 'archive_path', 'build', 'contains', 'load',
+           'names']
+
+
+class LicenseArchive():
+    """A memory-mapped license bundle"""
+    def __init__(self, path):
+        self.path = path
+        self._index = None
+
+        with open(path, 'rb') as archive:
+            self._data = mmap.mmap(archive.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, self._index_offset, self._index_size = \
+                _HEADER.unpack_from(self._data, 0)
+        except struct.error:
+            magic = None
+
+        if magic != _MAGIC or \
+           self._index_offset + self._index_size > len(self._data):
+            self._data.close()
+            raise ValueError("Not a license archive: '%s'" % path)
+
+    def get(self, kind, revision, spdx_id):
+        """Return the stored license data with the given key, or None"""
+        entry = self.index.get(entry_key(kind, revision, spdx_id))
+        if entry is None:
+            return None
+
+        offset, size = entry
+        return zlib.decompress(self._data[offset:offset + size]).decode('utf-8')
+
+    @property
+    def index(self):
+        """Return the mapping of keys to blob offsets, reading it on first use"""
+        if self._index is None:
+            start = self._index_offset
+            self._index = json.loads(
+                zlib.decompress(
+                    self._data[start:start + self._index_size]).decode('utf-8'))
+
+        return self._index
+
+    def names(self):
+        """Return the full names of archived licenses, keyed by SPDX id"""
+        entry = self.index.get(_NAMES_KEY)
+        if entry is None:
+            return {}
+
+        offset, size = entry
+        return json.loads(
+            zlib.decompress(self._data[offset:offset + size]).decode('utf-8'))
+
+    def close(self):
+        """Unmap the archive"""
+        self._data.close()
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index) - (_NAMES_KEY in self.index)
+
+    def __repr__(self):
+        """Return a debug string representing this LicenseArchive"""
+        return str((self.__class__.__name__, self.path))
+
+
+def archive_path():
+    """
+    Return the location of the license archive: $CPYWRITE_ARCHIVE, if set,
+    or else the bundle installed with this package
+    """
+    return os.environ.get('CPYWRITE_ARCHIVE', '').strip() or \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), _ARCHIVE_FILE)
+
+def build(path, entries, names=None):
+    """
+    Write an archive of the given (key, text) pairs to path, along with an
+    optional mapping of SPDX ids to full license names. Returns the number of
+    entries written
+    """
+    import tempfile
+    index = {}
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix='.tmp')
+    try:
+        with open(fd, 'wb') as archive:
+            archive.write(_HEADER.pack(_MAGIC, 0, 0))
+
+            for key, text in entries:
+                blob = zlib.compress(text.encode('utf-8'), 9)
+                index[key] = (archive.tell(), len(blob))
+                archive.write(blob)
+
+            count = len(index)
+            if names:
+                blob = zlib.compress(
+                    json.dumps(names, sort_keys=True).encode('utf-8'), 9)
+                index[_NAMES_KEY] = (archive.tell(), len(blob))
+                archive.write(blob)
+
+            index_offset = archive.tell()
+            index_blob = zlib.compress(
+                json.dumps(index, sort_keys=True).encode('utf-8'), 9)
+            archive.write(index_blob)
+            archive.seek(0)
+            archive.write(_HEADER.pack(_MAGIC, index_offset, len(index_blob)))
+
+        os.replace(tmp_path, path)
+    except (IOError, OSError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    with _LOCK:
+        stale = _OPENED.pop(os.path.abspath(path), None)
+    if stale:
+        stale.close()
+
+    return count
+
+def contains(kind, revision, spdx_id):
+    """Return True if the archive holds the given license data"""
+    archive = _open_archive()
+    return archive is not None and \
+        entry_key(kind, revision, spdx_id) in archive
+
+def load(kind, revision, spdx_id):
+    """
+    Return the archived text of the given kind ('xml' or 'txt') of the SPDX
+    license at the given revision, or None if there is no archive, or no
+    such entry
+    """
+    archive = _open_archive()
+    return archive.get(kind, revision, spdx_id) if archive is not None else None
+
+def names():
+    """Return the full names of archived licenses, keyed by SPDX id"""
+    archive = _open_archive()
+    return archive.names() if archive is not None else {}
+
+def _open_archive():
+    """Return the archive at archive_path(), mapping it on first use"""
+    path = os.path.abspath(archive_path())
+
+    with _LOCK:
+        if path not in _OPENED:
+            try:
+                _OPENED[path] = LicenseArchive(path)
+            except (IOError, OSError, ValueError):
+                _OPENED[path] = None
+
+        return _OPENED[path]
+
+_ARCHIVE_FILE = 'licenses.cpya'
+"""
+File name of the archive installed with this package
+"""
+
+_MAGIC = b'CPYWARC1'
+
+_NAMES_KEY = 'names.json'
+"""
+Index key of the license names blob, which no license resource key can
+collide with
+"""
+
+_HEADER = struct.Struct('<8sQI')
+"""
+Layout of the archive header: signature, index offset, index length
+"""
+
+_OPENED = {}
+"""
+Archives mapped by this process, keyed by path; None marks a missing or
+unreadable file
+"""
+
+_LOCK = Lock()
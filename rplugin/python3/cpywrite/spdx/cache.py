@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent and in-memory storage for license data downloaded from the SPDX
+"""
+import json
+import os
+from collections import OrderedDict
+from sys import platform
+from threading import Lock
+
+__all__ = ['LRUCache', 'cache_dir', 'contains', 'entries', 'entry_key', 'load',
+           'names', 'store']
+
+
+class LRUCache():
+    """A thread-safe mapping that evicts its least recently used items"""
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """Return the value stored under key, or default if there is none"""
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+                return self._items[key]
+            except KeyError:
+                return default
+
+    def put(self, key, value):
+        """Store a value, evicting the oldest item if the cache is full"""
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """Evict all items"""
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        """Return a debug string representing this LRUCache"""
+        return str((self.__class__.__name__, len(self), self.maxsize))
+
+
+def cache_dir():
+    """
+    Return the directory where license data is kept between sessions:
+    $CPYWRITE_CACHE_DIR, if set, or else a 'cpywrite' folder under the
+    platform's user cache directory
+    """
+    custom_dir = os.environ.get('CPYWRITE_CACHE_DIR', '').strip()
+    if custom_dir:
+        return os.path.abspath(os.path.expanduser(custom_dir))
+
+    if platform == 'win32':
+        base_dir = os.environ.get('LOCALAPPDATA') or \
+            os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    else:
+        base_dir = os.environ.get('XDG_CACHE_HOME') or \
+            os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(base_dir, 'cpywrite')
+
+def contains(kind, revision, spdx_id):
+    """Return True if the cache holds the given license data"""
+    return entry_key(kind, revision, spdx_id) in _read_index(cache_dir())
+
+def entries():
+    """Yield the key and text of every license resource in the cache"""
+    root = cache_dir()
+
+    for key in sorted(_read_index(root)):
+        try:
+            with open(os.path.join(root, key), 'r', encoding='utf-8') as cached:
+                yield (key, cached.read())
+        except (IOError, UnicodeDecodeError):
+            pass
+
+def entry_key(kind, revision, spdx_id):
+    """
+    Return the key of a license resource, which is also its path relative to
+    the cache directory
+    """
+    return '%s/%s.%s' % (revision, spdx_id, kind)
+
+def load(kind, revision, spdx_id):
+    """
+    Return the cached text of the given kind ('xml' or 'txt') of the SPDX
+    license fetched at the given revision, or None on a cache miss
+    """
+    root = cache_dir()
+    key = entry_key(kind, revision, spdx_id)
+
+    if key not in _read_index(root):
+        return None
+
+    try:
+        with open(os.path.join(root, key), 'r', encoding='utf-8') as cached:
+            return cached.read()
+    except (IOError, UnicodeDecodeError):
+        return None
+
+def names():
+    """
+    Return the full names of cached licenses, keyed by SPDX id, as recorded
+    when their XML data was stored
+    """
+    return {os.path.splitext(os.path.basename(key))[0]: meta['name']
+            for key, meta in _read_index(cache_dir()).items()
+            if isinstance(meta, dict) and meta.get('name')}
+
+def store(kind, revision, spdx_id, text, name=None):
+    """
+    Save license data to the cache, and record it in the index, along with
+    the license's full name, if given
+    """
+    root = cache_dir()
+    key = entry_key(kind, revision, spdx_id)
+
+    try:
+        os.makedirs(os.path.join(root, revision), exist_ok=True)
+        _write_atomic(os.path.join(root, key), text)
+
+        with _LOCK:
+            entries = _load_index_file(root)
+            entries[key] = {'bytes': len(text.encode('utf-8'))}
+            if name:
+                entries[key]['name'] = name
+            _write_atomic(os.path.join(root, _INDEX_FILE),
+                          json.dumps(entries, indent=1, sort_keys=True))
+            _INDEX.update(root=root, mtime=_index_mtime(root), entries=entries)
+    except (IOError, OSError):
+        return False
+
+    return True
+
+def _read_index(root):
+    """
+    Return the entries of the cache index, reading the index file only if
+    it's new or has changed since it was last read
+    """
+    with _LOCK:
+        mtime = _index_mtime(root)
+        if _INDEX['root'] != root or _INDEX['mtime'] != mtime:
+            _INDEX.update(root=root,
+                          mtime=mtime,
+                          entries=_load_index_file(root) if mtime else {})
+
+        return _INDEX['entries']
+
+def _load_index_file(root):
+    try:
+        with open(os.path.join(root, _INDEX_FILE), 'r', encoding='utf-8') as idx:
+            entries = json.load(idx)
+            return entries if isinstance(entries, dict) else {}
+    except (IOError, ValueError):
+        return {}
+
+def _index_mtime(root):
+    try:
+        return os.stat(os.path.join(root, _INDEX_FILE)).st_mtime_ns
+    except OSError:
+        return None
+
+def _write_atomic(file_path, text):
+    """Replace the contents of a file without exposing a partial write"""
+    import tempfile
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path),
+                                    prefix='.tmp', text=True)
+    try:
+        with open(fd, 'w', encoding='utf-8') as tmp:
+            tmp.write(text)
+        os.replace(tmp_path, file_path)
+    except (IOError, OSError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+_INDEX_FILE = 'index.json'
+"""
+Name of the file mapping cache entries to their metadata
+"""
+
+_INDEX = {'root': None, 'mtime': None, 'entries': {}}
+"""
+In-memory copy of the last index file read
+"""
+
+_LOCK = Lock()
@@ -4,17 +4,17 @@
 Utilities for fetching and printing open source license information
 """
 import os
-import tempfile
-import xml.etree.ElementTree as parser
-from http import client
+from bisect import bisect_left
 from itertools import dropwhile
 from re import search, sub
 from sys import stderr
-from textwrap import TextWrapper
-from urllib import request, error as urllib_error
-from urllib.parse import quote
+from cpywrite.spdx import archive, cache
+from cpywrite.timing import timed
 
-__all__ = ['License', 'licenses']
+# XML, network and thread pool modules are imported by the functions using
+# them, so that rendering from memoized headers doesn't pay for them
+
+__all__ = ['License', 'complete', 'licenses', 'prefetch']
 
 
 class License():
@@ -24,207 +24,90 @@ class License():
         self.license_name = None
         self.header_width = 76
 
-        try:
-            self.spdx_code = _SPDX_IDS[_SPDX_IDS.index(code)]
-        except ValueError as error:
-            raise ValueError("No such license '%s' on the SPDX index!"
-                             % (code)) from error
+        self.spdx_code = _SPDX_INDEX.get(code) or \
+            _SPDX_CASEFOLD_INDEX.get(str(code).casefold())
+
+        if not self.spdx_code:
+            suggestions = _suggest(str(code))
+            raise ValueError("No such license '%s' on the SPDX index!%s"
+                             % (code,
+                                (" Did you mean: %s?" % ', '.join(suggestions))
+                                if suggestions else ''))
 
     @property
+    @timed('header', lambda self: {'license': self.spdx_code})
     def header(self):
         """Return the standard header text, if any, of this License"""
         if not self.spdx_code:
             return ''
 
-        # compensate for the deletion of 'Inc.' from the FSF's address:
-        # https://github.com/spdx/license-list-XML/commit/fcb4c75#diff-792e39536c2b3cf11dcd8358d7304b1dbb1fea0735c8c8ea98a4882bc6ca8c95
-        spdx_revision = 'a7220b6da21b37279659abed0e1b009610931824' \
-            if self.spdx_code == 'GPL-2.0-or-later' else 'main'
-        xml_resource = 'https://raw.githubusercontent.com/' \
-                       'spdx/license-list-XML/%s/src/%s.xml'
-        resource = quote(xml_resource % (spdx_revision, self.spdx_code), safe='/:')
-        license_data = None
-        cache = _find_cached_license(self.spdx_code)
-        header_text = []
-        should_wrap = False
-
-        if cache:
-            try:
-                with open(cache, 'r', encoding='utf-8') as tmp:
-                    license_data = parser.fromstring(tmp.read())
-            except (parser.ParseError, IOError):
-                pass
-
-        if license_data is None:
-            license_data = _fetch_license(resource, self.spdx_code)
-
-        if license_data is None:
-            return ''
+        spdx_revision = _header_revision(self.spdx_code)
+        memo_key = (self.spdx_code, spdx_revision, self.header_width)
+        memo = _PARSED_HEADERS.get(memo_key)
+
+        if memo is None:
+            import xml.etree.ElementTree as parser
+            license_data = None
+            cached = _load_license('xml', spdx_revision, self.spdx_code)
+
+            if cached:
+                try:
+                    license_data = parser.fromstring(cached)
+                except parser.ParseError:
+                    pass
+
+            if license_data is None:
+                license_data = _fetch_license(_header_source(self.spdx_code)[1],
+                                              self.spdx_code, spdx_revision)
+
+            if license_data is None:
+                return ''
 
-        for child in license_data:
-            if child.tag == '{http://www.spdx.org/license}license':
-                self.license_name = child.attrib.get('name')
-
-        header_tag = \
-            './/{http://www.spdx.org/license}standardLicenseHeader'
-        p_tag = ('{http://www.spdx.org/license}p')
-        alt_tag = ('{http://www.spdx.org/license}alt')
-        opt_tag = ('{http://www.spdx.org/license}optional')
-
-        for node in license_data.findall(header_tag):
-            for child in node.iter():
-                content = ''
-
-                if child.attrib.get('name') == 'copyright':
-                    content = child.text
-                    if self.spdx_code.startswith('GFDL') and \
-                       child.tail:
-                        content += child.tail.strip() + ' '
-                elif child.attrib.get('name') == 'version':
-                    content = child.text
-                    if child.tail:
-                        content += child.tail or ''
-                elif self.spdx_code.startswith('GFDL') and \
-                    (child.attrib.get('name') == 'invariantSections' or \
-                     child.attrib.get('name') == 'frontCoverTexts' or \
-                     child.attrib.get('name') == 'backCoverTexts'):
-                    content = child.text
-                    if child.tail:
-                        content += child.tail.strip() + ' '
-                elif child.tag == opt_tag and \
-                        child.attrib.get('spacing') == 'after':
-                    content = ', ' + child.tail.strip()
-                elif self.spdx_code.startswith('GPL-2.0') and child.tag == alt_tag:
-                    content = sub(r'\s{2,}', ' ', child.text) + (child.tail or '')
-                else:
-                    content = child.text if (child.text and \
-                                child.tag != alt_tag and \
-                                child.tag != opt_tag and \
-                                any((ch for ch in child.text if ch.isalpha()))) \
-                               else (child.tail or '')
-
-                line = sub(r'\n\s+', '\n', content.lstrip())
-                should_wrap = \
-                    bool([ln for ln in line.splitlines() \
-                          if len(ln) > self.header_width])
-
-                if child.tag == p_tag:
-                    header_text.append('\n\n' + line)
-                else:
-                    header_text.append(line)
-
-        # - drop leading empty lines;
-        # - don't break before URLs; but . . .
-        # - if a line starts with a URL, indent it;
-        # - remove extra space before URLs;
-        # - keep authorship on same line as copyright;
-        # - remove extra lines between paragraphs
-        header = list(
-            dropwhile(
-                lambda ln: not ln.strip(),
-                sub(r'\nhttp',
-                    ' http',
-                    sub(r'\n{2}http',
-                        '\n\n    http',
-                        sub(r'(?!\n)\s{2,}http',
-                            ' http',
-                            sub(r'([cC]opyright(\s+\([cC]\))?)\s*\n',
-                                'Copyright (c) ',
-                                sub(r'\n{3,}',
-                                    '\n\n',
-                                    ''.join(header_text)))))).splitlines()))
-
-        return header \
-                if not should_wrap \
-                else _wrap_header(header, self.header_width)
+            memo = _parse_header(license_data, self.spdx_code, self.header_width)
+            _PARSED_HEADERS.put(memo_key, memo)
+
+        self.license_name, header = memo
+
+        return list(header)
 
     @property
+    @timed('license_text', lambda self: {'license': self.spdx_code})
     def license_text(self):
         """Return the full text of this License"""
         if not self.spdx_code:
             return ''
 
-        # TODO: find a more reliable license generator: # pylint: disable=W0511
-        # https://github.com/spdx/license-list-data/blob/main/text/MIT.txt
-        # https://github.com/spdx/license-list-data/blob/main/text/0BSD.txt
-        # https://github.com/spdx/license-list-data/blob/2e20899c0504ff6c0acfcc1b0994d7163ce46939/text/Unlicense.txt#L10
-        # https://github.com/spdx/license-list-data/blob/2e20899c0504ff6c0acfcc1b0994d7163ce46939/text/BSD-1-Clause.txt#L9
-        #
-        # full text of new licenses added since v3.11 are fetched from
-        # the HEAD of spdx/license-list-data; USE THEM AT YOUR OWN RISK
-        spdx_revision = '2e20899c0504ff6c0acfcc1b0994d7163ce46939' \
-            if not (self.spdx_code.startswith('CC-BY') or self.spdx_code in [
-                'AdaCore-doc',
-                'ASWF-Digital-Assets-1.0',
-                'ASWF-Digital-Assets-1.1',
-                'Boehm-GC',
-                'BSD-3-Clause-Modification',
-                'BSD-3-Clause-No-Military-License',
-                'BSD-4-Clause-Shortened',
-                'C-UDA-1.0',
-                'DRL-1.0',
-                'dtoa',
-                'FreeBSD-DOC',
-                'GD',
-                'Inner-Net-2.0',
-                'Latex2e-translated-notice',
-                'Linux-man-pages-1-para',
-                'Linux-man-pages-copyleft-2-para',
-                'Linux-man-pages-copyleft-var',
-                'metamail',
-                'MIT-Modern-Variant',
-                'MIT-Festival',
-                'NIST-Software',
-                'OGDL-Taiwan-1.0',
-                'OLFL-1.3',
-                'OPL-UK-3.0',
-                'SGP4',
-                'TermReadKey',
-                'UnixCrypt',
-                'Widget-Workshop',
-                'Xdebug-1.03',
-                'Xfig']) \
-            else 'main'
-
-        text_resource = 'https://raw.githubusercontent.com/' \
-                       'spdx/license-list-data/' + spdx_revision + \
-                       '/text/%s.txt'
-
-        if self.spdx_code in ['Unlicense', 'BSD-1-Clause']:
-            text_resource = 'https://raw.githubusercontent.com/' \
-                           'spdx/license-list-data/' \
-                           'cade284866b0a1b6b18d7cb159279d3d41e6fa07/text/%s.txt'
-
-        resource = quote(text_resource % self.spdx_code, safe='/,:')
-        license_text = None
-        cache = _find_cached_license(self.spdx_code, '.txt')
-
-        if cache:
-            try:
-                with open(cache, 'r', encoding='utf-8') as tmp:
-                    license_text = tmp.read()
-            except IOError:
-                pass
-
-        if license_text is None:
-            license_text = _fetch_license(resource, self.spdx_code)
-
-        if license_text is None:
-            return ''
-
-        # - try to keep sub-clauses left-aligned;
-        # - try to preserve indent of copyright notice;
-        # - always put copyright notice on a new line;
-        # - remove extra lines between paragraphs
-        return sub(r'\n{2}\s+\-',
-                   '\n\n     -',
-                   sub(r'\n{2}\s+[cC]opyright',
-                       '\n\n     Copyright',
-                       sub(r'(?!$) ([cC]opyright(\s+\([cC]\))?\s+[\<\[\s][yearxYEARX]+)',
-                           '\n\nCopyright (c) <year>',
-                           sub(r'\n{3,}',
-                               '\n\n',
-                               license_text)))).splitlines()
+        spdx_revision = _text_revision(self.spdx_code)
+        memo_key = (self.spdx_code, spdx_revision)
+        memo = _LICENSE_TEXTS.get(memo_key)
+
+        if memo is None:
+            license_text = _load_license('txt', spdx_revision, self.spdx_code)
+
+            if license_text is None:
+                license_text = _fetch_license(_text_source(self.spdx_code)[1],
+                                              self.spdx_code, spdx_revision)
+
+            if license_text is None:
+                return ''
+
+            # - try to keep sub-clauses left-aligned;
+            # - try to preserve indent of copyright notice;
+            # - always put copyright notice on a new line;
+            # - remove extra lines between paragraphs
+            memo = tuple(
+                sub(r'\n{2}\s+\-',
+                    '\n\n     -',
+                    sub(r'\n{2}\s+[cC]opyright',
+                        '\n\n     Copyright',
+                        sub(r'(?!$) ([cC]opyright(\s+\([cC]\))?\s+[\<\[\s][yearxYEARX]+)',
+                            '\n\nCopyright (c) <year>',
+                            sub(r'\n{3,}',
+                                '\n\n',
+                                license_text)))).splitlines())
+            _LICENSE_TEXTS.put(memo_key, memo)
+
+        return list(memo)
 
     @property
     def tag(self):
@@ -269,12 +152,181 @@ def licenses():
     """Return all SPDX ids of candidate licenses"""
     return _SPDX_IDS
 
+def complete(prefix=''):
+    """
+    Return the SPDX ids starting with the given prefix, ignoring case, in
+    the same order as licenses()
+    """
+    if not prefix:
+        return list(_SPDX_IDS)
+
+    prefix = prefix.casefold()
+    start = bisect_left(_SPDX_PREFIXES, (prefix,))
+    end = bisect_left(_SPDX_PREFIXES, (prefix + '\U0010ffff',), start)
+
+    return [_SPDX_IDS[pos] for pos in sorted(pos for _, pos in
+                                             _SPDX_PREFIXES[start:end])]
+
+def prefetch(spdx_ids=None, jobs=8, progress=None):
+    """
+    Download the XML data and full text of the given licenses (or all of
+    them) into the cache, running up to the given number of requests at once.
+
+    Optionally calls progress(done, total, resource_name, status) as each
+    download completes. Returns a dict of resource names, sorted into
+    lists by status: 'fetched', 'cached', or 'failed'
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    summary = {'fetched': [], 'cached': [], 'failed': []}
+    tasks = []
+
+    for code in (spdx_ids or _SPDX_IDS):
+        try:
+            spdx_code = License(code).spdx_code
+        except ValueError:
+            summary['failed'].append(code)
+            continue
+
+        for kind, source in (('xml', _header_source), ('txt', _text_source)):
+            tasks.append((kind, spdx_code) + source(spdx_code))
+
+    def _prefetch_one(kind, spdx_code, revision, resource):
+        if archive.contains(kind, revision, spdx_code) or \
+           cache.contains(kind, revision, spdx_code):
+            return 'cached'
+        return 'fetched' \
+            if _fetch_license(resource, spdx_code, revision) is not None \
+            else 'failed'
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        pending = {pool.submit(_prefetch_one, *task): task for task in tasks}
+
+        for done, future in enumerate(as_completed(pending), 1):
+            kind, spdx_code = pending[future][:2]
+            resource_name = '%s.%s' % (spdx_code, kind)
+            status = future.result()
+            summary[status].append(resource_name)
+            if progress:
+                progress(done, len(tasks), resource_name, status)
+
+    return {status: sorted(names) for status, names in summary.items()}
+
 def in_pub_domain(license_id):
     """Return True if this License has no copyright requirement"""
     return license_id in _PD_LICENSE_IDS
 
+def _suggest(code, limit=3):
+    """Return up to limit SPDX ids resembling the given unknown one"""
+    from difflib import get_close_matches
+    key = _family(code)
+    candidates = _SPDX_FAMILIES.get(key, ()) if key else ()
+
+    return [_SPDX_CASEFOLD_INDEX[match]
+            for match in get_close_matches(code.casefold(), candidates,
+                                           n=limit, cutoff=0.4)]
+
+def _family(code):
+    """Return the first run of letters in an SPDX id, e.g. 'gpl' for 'GPL-3.0'"""
+    found = search(r'[a-z]+', code.casefold())
+    return found.group() if found else ''
+
+@timed('parse', lambda license_data, spdx_code, width: {'license': spdx_code})
+def _parse_header(license_data, spdx_code, width):
+    """
+    Return the license name and standard header lines found in the given
+    SPDX license data
+    """
+    license_name = _license_name(license_data)
+    header_text = []
+    should_wrap = False
+
+    header_tag = \
+        './/{http://www.spdx.org/license}standardLicenseHeader'
+    p_tag = ('{http://www.spdx.org/license}p')
+    alt_tag = ('{http://www.spdx.org/license}alt')
+    opt_tag = ('{http://www.spdx.org/license}optional')
+
+    for node in license_data.findall(header_tag):
+        for child in node.iter():
+            content = ''
+
+            if child.attrib.get('name') == 'copyright':
+                content = child.text
+                if spdx_code.startswith('GFDL') and \
+                   child.tail:
+                    content += child.tail.strip() + ' '
+            elif child.attrib.get('name') == 'version':
+                content = child.text
+                if child.tail:
+                    content += child.tail or ''
+            elif spdx_code.startswith('GFDL') and \
+                (child.attrib.get('name') == 'invariantSections' or \
+                 child.attrib.get('name') == 'frontCoverTexts' or \
+                 child.attrib.get('name') == 'backCoverTexts'):
+                content = child.text
+                if child.tail:
+                    content += child.tail.strip() + ' '
+            elif child.tag == opt_tag and \
+                    child.attrib.get('spacing') == 'after':
+                content = ', ' + child.tail.strip()
+            elif spdx_code.startswith('GPL-2.0') and child.tag == alt_tag:
+                content = sub(r'\s{2,}', ' ', child.text) + (child.tail or '')
+            else:
+                content = child.text if (child.text and \
+                            child.tag != alt_tag and \
+                            child.tag != opt_tag and \
+                            any((ch for ch in child.text if ch.isalpha()))) \
+                           else (child.tail or '')
+
+            line = sub(r'\n\s+', '\n', content.lstrip())
+            should_wrap = \
+                bool([ln for ln in line.splitlines() \
+                      if len(ln) > width])
+
+            if child.tag == p_tag:
+                header_text.append('\n\n' + line)
+            else:
+                header_text.append(line)
+
+    # - drop leading empty lines;
+    # - don't break before URLs; but . . .
+    # - if a line starts with a URL, indent it;
+    # - remove extra space before URLs;
+    # - keep authorship on same line as copyright;
+    # - remove extra lines between paragraphs
+    header = list(
+        dropwhile(
+            lambda ln: not ln.strip(),
+            sub(r'\nhttp',
+                ' http',
+                sub(r'\n{2}http',
+                    '\n\n    http',
+                    sub(r'(?!\n)\s{2,}http',
+                        ' http',
+                        sub(r'([cC]opyright(\s+\([cC]\))?)\s*\n',
+                            'Copyright (c) ',
+                            sub(r'\n{3,}',
+                                '\n\n',
+                                ''.join(header_text)))))).splitlines()))
+
+    if should_wrap:
+        header = _wrap_header(header, width)
+
+    return (license_name, tuple(header))
+
+def _license_name(license_data):
+    """Return the full name given in SPDX license data, if any"""
+    license_name = None
+
+    for child in license_data:
+        if child.tag == '{http://www.spdx.org/license}license':
+            license_name = child.attrib.get('name')
+
+    return license_name
+
 def _wrap_header(header_lines, limit):
     """Keep header to a prescribed width"""
+    from textwrap import TextWrapper
     wrapper = TextWrapper(drop_whitespace=False, replace_whitespace=False,
                           width=limit)
     header_lines = ['\n' if not s.strip() else s + ' ' for s in header_lines]
@@ -284,55 +336,137 @@ def _wrap_header(header_lines, limit):
             '\n'.join([ln.lstrip() for ln \
                        in wrapper.wrap(''.join(header_lines))])).splitlines()
 
-def _find_cached_license(short_name, ext='.xml'):
-    """Return the path to a temp file saved with the given SPDX id as prefix"""
-    for root, _, files in os.walk(tempfile.gettempdir()):
-        found = [f for f in files \
-                 if search(r'^(%s)_' % short_name, f) and \
-                 os.path.splitext(f)[1] == ext]
-        if found:
-            return os.path.join(root, found[0])
-
-    return None
-
-def _fetch_license(resource, spdx_id):
+def _base_url():
+    """
+    Return the root URL of the SPDX license repositories, which can be
+    overridden by setting $CPYWRITE_SPDX_URL, e.g. to a local mirror
+    """
+    return os.environ.get('CPYWRITE_SPDX_URL', '').strip().rstrip('/') or \
+        'https://raw.githubusercontent.com/spdx'
+
+def _header_source(spdx_code):
+    """Return the pinned revision and URL of a license's XML data"""
+    from urllib.parse import quote
+    spdx_revision = _header_revision(spdx_code)
+    xml_resource = _base_url() + '/license-list-XML/%s/src/%s.xml'
+
+    return (spdx_revision,
+            quote(xml_resource % (spdx_revision, spdx_code), safe='/:'))
+
+def _header_revision(spdx_code):
+    """Return the pinned revision of a license's XML data"""
+    # compensate for the deletion of 'Inc.' from the FSF's address:
+    # https://github.com/spdx/license-list-XML/commit/fcb4c75#diff-792e39536c2b3cf11dcd8358d7304b1dbb1fea0735c8c8ea98a4882bc6ca8c95
+    return 'a7220b6da21b37279659abed0e1b009610931824' \
+        if spdx_code == 'GPL-2.0-or-later' else 'main'
+
+def _text_source(spdx_code):
+    """Return the pinned revision and URL of a license's full text"""
+    from urllib.parse import quote
+    spdx_revision = _text_revision(spdx_code)
+    text_resource = _base_url() + '/license-list-data/%s/text/%s.txt'
+
+    return (spdx_revision,
+            quote(text_resource % (spdx_revision, spdx_code), safe='/,:'))
+
+def _text_revision(spdx_code):
+    """Return the pinned revision of a license's full text"""
+    # TODO: find a more reliable license generator: # pylint: disable=W0511
+    # https://github.com/spdx/license-list-data/blob/main/text/MIT.txt
+    # https://github.com/spdx/license-list-data/blob/main/text/0BSD.txt
+    # https://github.com/spdx/license-list-data/blob/2e20899c0504ff6c0acfcc1b0994d7163ce46939/text/Unlicense.txt#L10
+    # https://github.com/spdx/license-list-data/blob/2e20899c0504ff6c0acfcc1b0994d7163ce46939/text/BSD-1-Clause.txt#L9
+    #
+    # full text of new licenses added since v3.11 are fetched from
+    # the HEAD of spdx/license-list-data; USE THEM AT YOUR OWN RISK
+    spdx_revision = '2e20899c0504ff6c0acfcc1b0994d7163ce46939' \
+        if not (spdx_code.startswith('CC-BY') or spdx_code in [
+            'AdaCore-doc',
+            'ASWF-Digital-Assets-1.0',
+            'ASWF-Digital-Assets-1.1',
+            'Boehm-GC',
+            'BSD-3-Clause-Modification',
+            'BSD-3-Clause-No-Military-License',
+            'BSD-4-Clause-Shortened',
+            'C-UDA-1.0',
+            'DRL-1.0',
+            'dtoa',
+            'FreeBSD-DOC',
+            'GD',
+            'Inner-Net-2.0',
+            'Latex2e-translated-notice',
+            'Linux-man-pages-1-para',
+            'Linux-man-pages-copyleft-2-para',
+            'Linux-man-pages-copyleft-var',
+            'metamail',
+            'MIT-Modern-Variant',
+            'MIT-Festival',
+            'NIST-Software',
+            'OGDL-Taiwan-1.0',
+            'OLFL-1.3',
+            'OPL-UK-3.0',
+            'SGP4',
+            'TermReadKey',
+            'UnixCrypt',
+            'Widget-Workshop',
+            'Xdebug-1.03',
+            'Xfig']) \
+        else 'main'
+
+    if spdx_code in ['Unlicense', 'BSD-1-Clause']:
+        spdx_revision = 'cade284866b0a1b6b18d7cb159279d3d41e6fa07'
+
+    return spdx_revision
+
+@timed('load', lambda kind, revision, spdx_id: {'license': spdx_id,
+                                                'kind': kind})
+def _load_license(kind, revision, spdx_id):
+    """
+    Return license data from the offline archive or the cache, or None if
+    it has to be downloaded
+    """
+    license_data = archive.load(kind, revision, spdx_id)
+
+    return license_data \
+        if license_data is not None \
+        else cache.load(kind, revision, spdx_id)
+
+@timed('fetch', lambda resource, spdx_id, revision: {'resource': resource})
+def _fetch_license(resource, spdx_id, revision):
+    """
+    Download license data from the SPDX, and save it to the cache under the
+    given revision
+    """
+    import xml.etree.ElementTree as parser
+    from http import client
+    from cpywrite.spdx import pool
     license_data = None
     _, ext = os.path.splitext(resource)
 
     try:
-        with request.urlopen(request.Request(resource)) as response:
-            if response.status == 200:
-                response_text = response.read().decode('utf8')
-                if ext.lower() == '.xml':
-                    try:
-                        license_data = parser.fromstring(response_text)
-                    except (client.IncompleteRead, parser.ParseError, TypeError):
-                        print("Got invalid licence data from %s." % (resource),
-                              file=stderr)
-                else:
-                    license_data = response_text
+        status, response_body = pool.get(resource)
 
+        if status == 200:
+            response_text = response_body.decode('utf8')
+            if ext.lower() == '.xml':
                 try:
-                    _, temp_file = \
-                        tempfile.mkstemp(prefix=spdx_id + '_',
-                                         suffix=ext,
-                                         text=True)
-                    if temp_file:
-                        try:
-                            with open(temp_file, 'w', encoding='utf-8') as tmp:
-                                tmp.write(response_text)
-                        except IOError:
-                            pass
-
-                except IOError:
-                    pass
+                    license_data = parser.fromstring(response_text)
+                except (parser.ParseError, TypeError):
+                    print("Got invalid licence data from %s." % (resource),
+                          file=stderr)
             else:
-                print("Unexpected response [%d] from %s.\n"
-                      % (response.status_code, resource),
-                      file=stderr)
-
-    except (urllib_error.HTTPError,
-            urllib_error.URLError):
+                license_data = response_text
+
+            if license_data is not None:
+                cache.store(ext.lower()[1:], revision, spdx_id, response_text,
+                            _license_name(license_data)
+                            if ext.lower() == '.xml' else None)
+        else:
+            print("Unexpected response [%d] from %s.\n"
+                  % (status, resource),
+                  file=stderr)
+
+    except (client.HTTPException, OSError, UnicodeDecodeError):
         print("Error requesting %s." % (resource), file=stderr)
 
     return license_data
@@ -805,10 +939,48 @@ _SPDX_IDS = [
 List of SPDX License Identifiers: https://spdx.org/licenses/
 """
 
-_PD_LICENSE_IDS = [
+_PD_LICENSE_IDS = frozenset([
     'ANTLR-PD', 'ANTLR-PD-fallback', 'CC-PDDC', 'CC0-1.0',
     'libselinux-1.0', 'NIST-PD', 'NIST-PD-fallback', 'PDDL-1.0',
-    'SAX-PD', 'SGP4', 'Unlicense']
+    'SAX-PD', 'SGP4', 'Unlicense'])
 """
 Licenses with no copyright requirement
 """
+
+_SPDX_INDEX = {code: code for code in _SPDX_IDS}
+"""
+Valid SPDX ids, for constant-time lookup
+"""
+
+_SPDX_CASEFOLD_INDEX = {code.casefold(): code for code in _SPDX_IDS}
+"""
+SPDX ids keyed by their case-folded form, e.g. 'mit' => 'MIT'
+"""
+
+_SPDX_PREFIXES = sorted((code.casefold(), pos)
+                        for pos, code in enumerate(_SPDX_IDS))
+"""
+Case-folded SPDX ids, sorted for prefix search, paired with their position
+in _SPDX_IDS
+"""
+
+_SPDX_FAMILIES = {}
+"""
+Case-folded SPDX ids grouped by their leading run of letters, e.g.
+'gpl' => ['gpl-1.0', 'gpl-1.0+', ...], for suggesting near misses
+"""
+
+for _code in _SPDX_IDS:
+    _SPDX_FAMILIES.setdefault(_family(_code), []).append(_code.casefold())
+del _code
+
+_PARSED_HEADERS = cache.LRUCache(maxsize=64)
+"""
+Names and standard headers of recently used licenses, keyed by SPDX id,
+revision and header width
+"""
+
+_LICENSE_TEXTS = cache.LRUCache(maxsize=16)
+"""
+Full text of recently used licenses, keyed by SPDX id and revision
+"""
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent HTTP(S) connections for downloading license data
+"""
+import socket
+import ssl
+from http import client
+from threading import Lock
+from time import monotonic
+from urllib.parse import urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+__all__ = ['ConnectionPool', 'get']
+
+
+class ConnectionPool():
+    """
+    Keeps connections open between requests to the same host, so that
+    consecutive downloads share one TCP connection and TLS session
+    """
+    def __init__(self, maxsize=8, timeout=30, retry_after=30):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._idle = {}
+        self._unresolved = {}
+        self._lock = Lock()
+        self._ssl_context = None
+
+    def get(self, url, max_redirects=3):
+        """Request url, returning the response status and body"""
+        for _ in range(max_redirects + 1):
+            status, headers, body = self._request(url)
+
+            if status in (301, 302, 303, 307, 308) and headers.get('Location'):
+                url = urljoin(url, headers['Location'])
+                continue
+
+            break
+
+        return (status, body)
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    def _request(self, url):
+        parts = urlsplit(url)
+        key = (parts.scheme.lower(), parts.hostname, parts.port)
+        target = parts.path or '/'
+
+        if parts.query:
+            target += '?' + parts.query
+
+        # a connection left idle may have been dropped by the server, so
+        # failures on reused connections are retried until a fresh one fails
+        while True:
+            conn, reused = self._acquire(key)
+
+            try:
+                if getattr(conn, 'forward_proxy', False):
+                    target = url
+
+                conn.request('GET', target, headers={'User-Agent': 'vim-cpywrite'})
+                response = conn.getresponse()
+                body = response.read()
+            except socket.gaierror:
+                # don't wait on the resolver again for every download while
+                # offline
+                conn.close()
+                with self._lock:
+                    self._unresolved[key] = monotonic() + self.retry_after
+                raise
+            except (client.HTTPException, OSError):
+                conn.close()
+                if reused:
+                    continue
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+
+            return (response.status, response.headers, body)
+
+    def _acquire(self, key):
+        """Return an idle connection to the given host, or else a new one"""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return (idle.pop(), True)
+
+            if self._unresolved.get(key, 0) > monotonic():
+                raise socket.gaierror("Recently failed to resolve '%s'" % key[1])
+
+        return (self._connect(*key), False)
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+
+        conn.close()
+
+    def _connect(self, scheme, host, port):
+        proxy = getproxies().get(scheme)
+        proxy = urlsplit(proxy) if proxy and not proxy_bypass(host) else None
+
+        if scheme == 'https':
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+
+            if proxy:
+                conn = client.HTTPSConnection(proxy.hostname, proxy.port or 80,
+                                              timeout=self.timeout,
+                                              context=self._ssl_context)
+                conn.set_tunnel(host, port)
+            else:
+                conn = client.HTTPSConnection(host, port,
+                                              timeout=self.timeout,
+                                              context=self._ssl_context)
+        elif scheme == 'http':
+            if proxy:
+                conn = client.HTTPConnection(proxy.hostname, proxy.port or 80,
+                                             timeout=self.timeout)
+                conn.forward_proxy = True
+            else:
+                conn = client.HTTPConnection(host, port, timeout=self.timeout)
+        else:
+            raise client.InvalidURL("Unsupported URL scheme: '%s'" % scheme)
+
+        return conn
+
+    def __repr__(self):
+        """Return a debug string representing this ConnectionPool"""
+        return str((self.__class__.__name__,
+                    {'%s://%s' % key[:2]: len(idle)
+                     for key, idle in self._idle.items()}))
+
+
+def get(url):
+    """Request url over a pooled connection, returning status and body"""
+    return _POOL.get(url)
+
+_POOL = ConnectionPool()
+"""
+Connections shared by all downloads in this process
+"""
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""
+Ranked, typo-tolerant search over SPDX ids and full license names
+"""
+from bisect import bisect_left
+from heapq import nsmallest
+from re import findall
+from threading import Lock
+from cpywrite.spdx import archive, cache
+from cpywrite.spdx.license import licenses
+
+__all__ = ['SearchIndex', 'license_names', 'search']
+
+
+class SearchIndex():
+    """
+    An inverted index of the words in license ids and names, with a trigram
+    index of the words themselves for matching misspellings
+    """
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self._postings = {}
+        self._trigrams = {}
+        self._trigram_counts = {}
+        self._ids = []
+
+        for doc, (spdx_id, name) in enumerate(self.documents):
+            id_words = _words(spdx_id)
+            self._ids.append((''.join(id_words), len(id_words)))
+            for word in id_words + _words(name or ''):
+                self._postings.setdefault(word, set()).add(doc)
+
+        self._vocabulary = sorted(self._postings)
+        for word in self._vocabulary:
+            trigrams = _trigrams(word)
+            self._trigram_counts[word] = len(trigrams)
+            for trigram in trigrams:
+                self._trigrams.setdefault(trigram, []).append(word)
+
+    def search(self, query, limit=10):
+        """
+        Return the ids of up to limit documents matching query, best first.
+        An exact id ranks first, then documents matching more of the query's
+        words, then those matching them more closely, then shorter ids
+        """
+        scores = {}
+
+        for term in set(_words(query)):
+            best = {}
+            for word, weight in self._expand(term):
+                for doc in self._postings[word]:
+                    if weight > best.get(doc, 0):
+                        best[doc] = weight
+
+            for doc, weight in best.items():
+                matched, score = scores.get(doc, (0, 0))
+                scores[doc] = (matched + 1, score + weight)
+
+        compact_query = ''.join(_words(query))
+
+        def _rank(item):
+            doc, (matched, score) = item
+            compact_id, length = self._ids[doc]
+            return (compact_id != compact_query,
+                    not compact_id.startswith(compact_query),
+                    -matched, -score, length, doc)
+
+        return [self.documents[doc][0]
+                for doc, _ in nsmallest(limit, scores.items(), key=_rank)]
+
+    def _expand(self, term):
+        """
+        Yield the indexed words resembling a query term, weighted by how
+        closely they match it
+        """
+        if term in self._postings:
+            yield (term, 3.0)
+
+        start = bisect_left(self._vocabulary, term)
+        for word in self._vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            if word != term:
+                yield (word, 2.0)
+
+        if len(term) < 3:
+            return
+
+        term_trigrams = _trigrams(term)
+        shared = {}
+        for trigram in term_trigrams:
+            for word in self._trigrams.get(trigram, ()):
+                shared[word] = shared.get(word, 0) + 1
+
+        for word, count in shared.items():
+            similarity = count / \
+                (len(term_trigrams) + self._trigram_counts[word] - count)
+            if similarity >= 0.3 and not word.startswith(term):
+                yield (word, 1.5 * similarity)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __repr__(self):
+        """Return a debug string representing this SearchIndex"""
+        return str((self.__class__.__name__, len(self), len(self._vocabulary)))
+
+
+def license_names():
+    """
+    Return the full names of all licenses found in the archive or the cache,
+    keyed by SPDX id. The same dict is returned, and must not be modified,
+    until a different archive is opened or the cache index changes
+    """
+    root = cache.cache_dir()
+    # pylint: disable=W0212
+    key = (archive._open_archive(), root, cache._index_mtime(root))
+
+    with _LOCK:
+        if _NAMES['names'] is None or _NAMES['key'] != key:
+            names = archive.names()
+            names.update(cache.names())
+            _NAMES.update(key=key, names=names)
+
+        return _NAMES['names']
+
+def search(query, limit=10):
+    """
+    Return the SPDX ids of up to limit licenses whose id or full name best
+    matches query, e.g. 'bsd 3' or 'lesser general'. Licenses that haven't
+    been downloaded or archived are searched by the names of the license
+    families in their ids, e.g. 'GNU Lesser General Public License' for
+    'LGPL-2.1-only'
+    """
+    names = license_names()
+
+    with _LOCK:
+        if _INDEX['index'] is None or _INDEX['names'] is not names:
+            _INDEX.update(names=names,
+                          index=SearchIndex((spdx_id, names.get(spdx_id) or
+                                             _family_names(spdx_id))
+                                            for spdx_id in licenses()))
+        index = _INDEX['index']
+
+    return index.search(query, limit)
+
+def _family_names(spdx_id):
+    """Return the names of the license families abbreviated in an SPDX id"""
+    return ' '.join(_FAMILY_NAMES[word] for word in _words(spdx_id)
+                    if word in _FAMILY_NAMES)
+
+def _words(text):
+    """Split text into lowercase words and numbers, e.g. 'bsd3' => bsd, 3"""
+    return findall(r'[^\W\d_]+|\d+', text.casefold())
+
+def _trigrams(word):
+    padded = '$%s$' % word
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+_FAMILY_NAMES = {
+    'afl': 'Academic Free License',
+    'agpl': 'GNU Affero General Public License',
+    'apsl': 'Apple Public Source License',
+    'bsd': 'Berkeley Software Distribution',
+    'by': 'Attribution',
+    'cc': 'Creative Commons',
+    'cddl': 'Common Development and Distribution License',
+    'cecill': 'CeCILL Free Software License',
+    'cern': 'CERN Open Hardware Licence',
+    'ecl': 'Educational Community License',
+    'epl': 'Eclipse Public License',
+    'eupl': 'European Union Public Licence',
+    'gfdl': 'GNU Free Documentation License',
+    'gpl': 'GNU General Public License',
+    'lgpl': 'GNU Lesser General Public License',
+    'lppl': 'LaTeX Project Public License',
+    'mpl': 'Mozilla Public License',
+    'nc': 'NonCommercial',
+    'nd': 'NoDerivatives',
+    'ofl': 'SIL Open Font License',
+    'oldap': 'Open LDAP Public License',
+    'osl': 'Open Software License',
+    'sa': 'ShareAlike',
+    'zpl': 'Zope Public License',
+}
+"""
+Names of common license families, keyed by their abbreviations in SPDX ids
+"""
+
+_NAMES = {'key': None, 'names': None}
+"""
+Full names of all licenses, and the archive, cache directory and cache index
+modification time they were read from
+"""
+
+_INDEX = {'names': None, 'index': None}
+"""
+Search index over all licenses, and the names it was built with
+"""
+
+_LOCK = Lock()
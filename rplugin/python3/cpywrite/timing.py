@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in timing of the phases of header generation, enabled by setting
+$CPYWRITE_PROFILE to 1, or by the command line's --profile option
+"""
+import json
+import os
+import sys
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock, local
+from time import perf_counter
+
+__all__ = ['enable', 'enabled', 'phase', 'records', 'timed']
+
+
+def enabled():
+    """Return True if phases are being timed"""
+    return _STATE['enabled']
+
+def enable(on=True, echo=True):
+    """
+    Start or stop timing phases. While on, each phase is recorded as it
+    ends, and also written to stderr as a line of JSON if echo is True
+    """
+    _STATE.update(enabled=bool(on), echo=bool(echo))
+
+def records():
+    """Return the most recently recorded phases, oldest first"""
+    return list(_RECORDS)
+
+@contextmanager
+def phase(name, **details):
+    """
+    Time the enclosed block as a phase with the given name. Any details are
+    recorded with it, e.g. the SPDX id or the file name
+    """
+    if not _STATE['enabled']:
+        yield
+        return
+
+    depth = getattr(_NESTING, 'depth', 0)
+    _NESTING.depth = depth + 1
+    start = perf_counter()
+
+    try:
+        yield
+    finally:
+        _NESTING.depth = depth
+        _record(name, perf_counter() - start, depth, details)
+
+def timed(name, details=None):
+    """
+    Decorate a function to time each call as a phase with the given name.
+    If given, details is called with the same arguments, and returns a dict
+    of details to record with the phase
+    """
+    def _decorate(func):
+        @wraps(func)
+        def _timed(*args, **kwargs):
+            if not _STATE['enabled']:
+                return func(*args, **kwargs)
+
+            with phase(name, **(details(*args, **kwargs) if details else {})):
+                return func(*args, **kwargs)
+
+        return _timed
+
+    return _decorate
+
+def _record(name, seconds, depth, details):
+    """Save a timed phase, and write it to stderr if echo is on"""
+    entry = {'phase': name, 'ms': round(seconds * 1000, 3), 'depth': depth}
+    entry.update(details)
+    _RECORDS.append(entry)
+
+    if _STATE['echo']:
+        with _LOCK:
+            print(json.dumps(entry), file=sys.stderr, flush=True)
+
+_STATE = {'enabled': os.environ.get('CPYWRITE_PROFILE', '').strip() == '1',
+          'echo': True}
+"""
+Whether phases are being timed, and written to stderr as they end
+"""
+
+_RECORDS = deque(maxlen=256)
+"""
+The most recently timed phases, for reporting in the editor
+"""
+
+_NESTING = local()
+"""
+How many timed phases enclose the running one, on each thread
+"""
+
+_LOCK = Lock()
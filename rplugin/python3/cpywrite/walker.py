@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lazy traversal of source trees, honouring .gitignore files
+"""
+import os
+import re
+from cpywrite.generator import _get_language_meta, _SPECIAL_FILE_NAMES
+
+__all__ = ['IgnoreRule', 'walk']
+
+
+class IgnoreRule():
+    """A .gitignore-style pattern, matched relative to a base directory"""
+    def __init__(self, pattern, base):
+        self.pattern = pattern
+        self.base = base
+        self.negated = pattern.startswith('!')
+        pattern = pattern[1:] if self.negated else pattern
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        # a pattern with a slash anywhere but the end matches from the base
+        # directory; otherwise it matches a name at any depth
+        self.anchored = '/' in pattern
+        self._regex = re.compile(_translate(pattern.lstrip('/')))
+
+    def matches(self, path, is_dir=False):
+        """Return True if the rule applies to path"""
+        if self.dir_only and not is_dir:
+            return False
+
+        rel_path = os.path.relpath(path, self.base).replace(os.sep, '/')
+        if rel_path.startswith('../'):
+            return False
+
+        return bool(self._regex.match(rel_path if self.anchored
+                                      else rel_path.rsplit('/', 1)[-1]))
+
+    def __repr__(self):
+        """Return a debug string representing this IgnoreRule"""
+        return str((self.__class__.__name__, self.pattern, self.base))
+
+
+def walk(paths, excludes=()):
+    """
+    Yield each file under the given paths whose extension is recognized by
+    the Generator type, skipping version control directories and anything
+    matched by a .gitignore file or the given exclude patterns. Directories
+    are read one entry at a time, so memory use depends only on the depth of
+    the tree
+    """
+    for root in paths:
+        cli_rules = [IgnoreRule(pattern, root) for pattern in excludes]
+
+        if not os.path.isdir(root):
+            if not _ignored(root, False, [], cli_rules):
+                yield root
+            continue
+
+        entries = _scandir(root)
+        if entries is None:
+            continue
+
+        rules = _read_ignore_file(root)
+        stack = [(entries, len(rules))]
+
+        try:
+            while stack:
+                entry = next(stack[-1][0], None)
+
+                if entry is None:
+                    entries, _ = stack.pop()
+                    entries.close()
+                    del rules[stack[-1][1] if stack else 0:]
+                    continue
+
+                # don't follow links: a link to a parent directory would
+                # loop, and one to a file might write outside the tree
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if (is_dir and entry.name in _VCS_DIRS) or \
+                   _ignored(entry.path, is_dir, rules, cli_rules):
+                    continue
+
+                if is_dir:
+                    entries = _scandir(entry.path)
+                    if entries is not None:
+                        rules.extend(_read_ignore_file(entry.path))
+                        stack.append((entries, len(rules)))
+                elif entry.is_file(follow_symlinks=False) and \
+                        _is_source_file(entry.name):
+                    yield entry.path
+        finally:
+            for entries, _ in stack:
+                entries.close()
+
+def _ignored(path, is_dir, rules, cli_rules):
+    """Return True if the last rule matching path excludes it"""
+    ignored = False
+
+    for rule in rules + cli_rules:
+        if rule.negated == ignored and rule.matches(path, is_dir):
+            ignored = not rule.negated
+
+    return ignored
+
+def _scandir(directory):
+    """
+    Return an iterator over a directory's entries, or None if it can't be
+    read, in which case it's skipped, as by os.walk
+    """
+    try:
+        return os.scandir(directory)
+    except OSError:
+        return None
+
+def _is_source_file(name):
+    """
+    Return True if name has a recognized extension, or is a build file like
+    'Makefile'. Scripts without an extension and dot files are only written
+    if named explicitly
+    """
+    try:
+        lang, ext, _ = _get_language_meta(name)
+        return bool(lang) and (bool(ext) or name.lower() in _SPECIAL_FILE_NAMES)
+    except ValueError:
+        return False
+
+def _read_ignore_file(directory):
+    """Return the rules in a directory's .gitignore file, if any"""
+    try:
+        with open(os.path.join(directory, '.gitignore'),
+                  encoding='utf-8') as ignore:
+            return [IgnoreRule(line, directory)
+                    for line in map(str.rstrip, ignore)
+                    if line and not line.startswith('#')]
+    except (IOError, OSError, UnicodeDecodeError):
+        return []
+
+def _translate(pattern):
+    """Return a regex for a glob pattern, where '**' spans directories"""
+    regex = ''
+    pos = 0
+
+    while pos < len(pattern):
+        if pattern.startswith('**/', pos):
+            regex += '(?:.*/)?'
+            pos += 3
+        elif pattern.startswith('/**', pos) and pos + 3 == len(pattern):
+            regex += '/.*'
+            pos += 3
+        elif pattern.startswith('**', pos):
+            regex += '.*'
+            pos += 2
+        elif pattern[pos] == '*':
+            regex += '[^/]*'
+            pos += 1
+        elif pattern[pos] == '?':
+            regex += '[^/]'
+            pos += 1
+        elif pattern[pos] == '[' and ']' in pattern[pos + 2:]:
+            end = pattern.index(']', pos + 2)
+            chars = pattern[pos + 1:end].replace('\\', '\\\\')
+            regex += '[%s]' % ('^' + chars[1:] if chars[0] == '!' else chars)
+            pos = end + 1
+        elif pattern[pos] == '\\' and pos + 1 < len(pattern):
+            regex += re.escape(pattern[pos + 1])
+            pos += 2
+        else:
+            regex += re.escape(pattern[pos])
+            pos += 1
+
+    # a directory pattern also matches everything beneath it
+    return regex + '(?:/.*)?$'
+
+_VCS_DIRS = frozenset(['.git', '.hg', '.svn'])
+"""
+Version control directories, which are never searched
+"""
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""
+Latency benchmark for Generator.fetch_license_header.
+
+Renders a header for every SPDX id, in every comment style, with every
+combination of options, and reports percentiles of the time taken:
+
+- cold: the first render of a case, with all in-memory memos cleared, so
+  license data is read from the cache directory and parsed;
+- warm: later renders of the same case, for another file name.
+
+By default, the cache is seeded with generated license data in a temporary
+directory, and downloads are pointed at a closed port, so timings never
+include the network. Pass --cache to time a real cache instead, e.g. one
+filled by 'CPYWRITE_CACHE_DIR=DIR python -m cpywrite --prefetch'.
+
+Usage:
+
+    python test/benchmark.py [-h] [--cache DIR] [--rounds N] [--json PATH]
+                             [--baseline PATH] [--tolerance RATIO] [ID ...]
+"""
+import json
+import os
+import sys
+import tempfile
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from itertools import product
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpywrite import generator  # pylint: disable=C0413
+from cpywrite.generator import Generator  # pylint: disable=C0413
+from cpywrite.spdx import cache, license as spdx  # pylint: disable=C0413
+
+
+def main():
+    """Run the benchmark and print a summary"""
+    parser = ArgumentParser(prog='benchmark',
+                            description="Time license header generation")
+    parser.add_argument('spdx_ids', nargs='*', metavar='ID',
+                        help="SPDX ids to render [all of them]")
+    parser.add_argument('--cache', action='store', metavar='DIR',
+                        dest='cache_dir', default=None,
+                        help="use the license data cached in DIR instead of \
+                        generated data")
+    parser.add_argument('--rounds', action='store', type=int, metavar='N',
+                        dest='rounds', default=3,
+                        help="warm renders per case [%(default)s]")
+    parser.add_argument('--json', action='store', metavar='PATH',
+                        dest='report', default=None,
+                        help="also write the results to PATH as JSON")
+    parser.add_argument('--baseline', action='store', metavar='PATH',
+                        dest='baseline', default=None,
+                        help="compare with the results of an earlier run, \
+                        and exit with 1 on a regression")
+    parser.add_argument('--tolerance', action='store', type=float,
+                        metavar='RATIO', dest='tolerance', default=0.25,
+                        help="with --baseline, how much slower a percentile \
+                        may be before it counts as a regression \
+                        [%(default)s]")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='cpywrite-bench') as tmp_dir:
+        os.environ['CPYWRITE_ARCHIVE'] = os.path.join(tmp_dir, 'none.cpya')
+        if args.cache_dir:
+            os.environ['CPYWRITE_CACHE_DIR'] = args.cache_dir
+        else:
+            os.environ['CPYWRITE_CACHE_DIR'] = os.path.join(tmp_dir, 'cache')
+            os.environ['CPYWRITE_SPDX_URL'] = 'http://127.0.0.1:9'
+            seed(args.spdx_ids or spdx.licenses())
+
+        results = run(args.spdx_ids or spdx.licenses(), max(1, args.rounds))
+
+    print(_format(results))
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as report:
+            json.dump(results, report, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for line in regressions:
+            print(line, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+def seed(spdx_ids):
+    """
+    Store generated XML data and full text for the given licenses in the
+    cache, shaped like the SPDX's: some headers have an authorship template,
+    some have none
+    """
+    for pos, spdx_id in enumerate(spdx_ids):
+        name = '%s License' % spdx_id
+        xml_revision = spdx._header_revision(spdx_id)
+        text_revision = spdx._text_revision(spdx_id)
+        template = _HEADER_TEMPLATES[pos % len(_HEADER_TEMPLATES)]
+
+        cache.store('xml', xml_revision, spdx_id,
+                    _XML % (spdx_id, name, template % {'name': name}), name)
+        cache.store('txt', text_revision, spdx_id, _TEXT % {'name': name})
+
+def run(spdx_ids, rounds=3):
+    """
+    Render every combination of license, comment style and options, and
+    return the cold and warm latency percentiles in milliseconds, along with
+    the slowest cases
+    """
+    samples = {'cold': [], 'warm': []}
+    slowest = []
+    failures = 0
+    author = generator._get_source_author()
+
+    for spdx_id, ext, flags in product(spdx_ids, comment_families(),
+                                       product((False, True), repeat=4)):
+        _clear_memos()
+        gen = Generator('bench' + ext, '', spdx_id)
+        cold, header = _time(gen, flags)
+        samples['cold'].append(cold)
+        slowest.append((cold, spdx_id, ext, flags))
+
+        if not header:
+            failures += 1
+
+        gen.set_file_props('other' + ext)
+        for _ in range(rounds):
+            samples['warm'].append(_time(gen, flags)[0])
+
+    slowest.sort(reverse=True)
+
+    return {
+        'licenses': len(spdx_ids),
+        'families': len(comment_families()),
+        'cases': len(samples['cold']),
+        'failures': failures,
+        'author': list(author),
+        'cold': percentiles(samples['cold']),
+        'warm': percentiles(samples['warm']),
+        'slowest': [{'license': spdx_id, 'extension': ext,
+                     'flags': list(flags), 'ms': round(seconds * 1000, 3)}
+                    for seconds, spdx_id, ext, flags in slowest[:10]],
+    }
+
+def comment_families():
+    """
+    Return a file extension for each distinct set of comment tokens known to
+    the Generator type
+    """
+    families = {}
+
+    for ext, (_, tokens) in sorted(generator._EXTENSION_INDEX.items()):
+        if ext:
+            families.setdefault(tokens, ext)
+
+    return sorted(families.values())
+
+def percentiles(samples):
+    """Return the 50th, 90th, 99th percentile and maximum of samples in ms"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def _rank(pct):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    return {'p50': round(_rank(50) * 1000, 4),
+            'p90': round(_rank(90) * 1000, 4),
+            'p99': round(_rank(99) * 1000, 4),
+            'max': round(ordered[-1] * 1000, 4)}
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Return a message for each percentile of results that is slower than in
+    the baseline by more than the given ratio
+    """
+    regressions = []
+
+    for phase, pct in product(('cold', 'warm'), ('p50', 'p90', 'p99')):
+        then = baseline.get(phase, {}).get(pct)
+        now = results[phase].get(pct)
+        if then and now and now > then * (1 + tolerance):
+            regressions.append('%s %s regressed: %.4f ms (was %.4f ms)'
+                               % (phase, pct, now, then))
+
+    return regressions
+
+def _time(gen, flags):
+    """Return the seconds taken to render a header, and the header"""
+    with redirect_stdout(StringIO()):
+        start = perf_counter()
+        header = gen.fetch_license_header(*flags)
+        return (perf_counter() - start, header)
+
+def _clear_memos():
+    spdx._PARSED_HEADERS.clear()
+    spdx._LICENSE_TEXTS.clear()
+    generator._HEADER_TEMPLATES.clear()
+
+def _format(results):
+    """Return the results as a table"""
+    lines = ['%d license(s) x %d comment style(s) x 16 option sets: '
+             '%d case(s), %d failure(s)'
+             % (results['licenses'], results['families'], results['cases'],
+                results['failures']),
+             '',
+             '%-6s %10s %10s %10s %10s' % ('(ms)', 'p50', 'p90', 'p99', 'max')]
+
+    for phase in ('cold', 'warm'):
+        lines.append('%-6s %10.4f %10.4f %10.4f %10.4f'
+                     % ((phase,) + tuple(results[phase][pct] for pct in
+                                         ('p50', 'p90', 'p99', 'max'))))
+
+    lines += ['', 'Slowest cold renders:']
+    lines += ['  %8.3f ms  %s  %s  %s' % (case['ms'], case['license'],
+                                          case['extension'], case['flags'])
+              for case in results['slowest']]
+
+    return '\n'.join(lines)
+
+_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<SPDXLicenseCollection xmlns="http://www.spdx.org/license">
+  <license licenseId="%s" name="%s">
+    <standardLicenseHeader>%s</standardLicenseHeader>
+  </license>
+</SPDXLicenseCollection>
+"""
+
+_HEADER_TEMPLATES = [
+    """
+      <p>Copyright <alt match=".+" name="copyright">[yyyy] [name of copyright owner]</alt></p>
+      <p>Licensed under the %(name)s (the "License"); you may not use this
+        file except in compliance with the License. You may obtain a copy of
+        the License at</p>
+      <p>http://www.example.org/licenses/LICENSE</p>
+      <p>Unless required by applicable law or agreed to in writing, software
+        distributed under the License is distributed on an "AS IS" BASIS,
+        WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+        implied.</p>
+    """,
+    """
+      <p>Copyright (C) <alt match=".+" name="copyright">yyyy name of author</alt></p>
+      <p>This program is free software; you can redistribute it and/or modify
+        it under the terms of the %(name)s as published by the Free Software
+        Foundation; either version 2 of the License, or
+        <optional spacing="after">(at your option)</optional> any later
+        version.</p>
+      <p>This program is distributed in the hope that it will be useful, but
+        WITHOUT ANY WARRANTY; without even the implied warranty of
+        MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.</p>
+    """,
+    "",
+]
+"""
+Shapes of generated license headers: with a bracketed authorship template,
+with an old-style one, and none at all
+"""
+
+_TEXT = """%(name)s
+
+Copyright (c) <year> <copyright holders>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, subject to the following conditions:
+
+  - The above copyright notice and this permission notice shall be included
+    in all copies or substantial portions of the Software.
+
+
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND.
+"""
+
+if __name__ == '__main__':
+    main()
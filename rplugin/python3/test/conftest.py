@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from pytest import fixture
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpywrite import generator  # pylint: disable=C0413
+from cpywrite.spdx import cache, pool, license as spdx  # pylint: disable=C0413
+
+APACHE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<SPDXLicenseCollection xmlns="http://www.spdx.org/license">
+  <license isOsiApproved="true" licenseId="Apache-2.0" name="Apache License 2.0">
+    <standardLicenseHeader>
+      <p>Copyright <alt match=".+" name="copyright">[yyyy] [name of copyright owner]</alt></p>
+      <p>Licensed under the Apache License, Version 2.0 (the "License");
+        you may not use this file except in compliance with the License.</p>
+    </standardLicenseHeader>
+  </license>
+</SPDXLicenseCollection>
+"""
+
+
+@fixture
+def cache_root(tmp_path, monkeypatch):
+    """Point the license cache at an empty directory"""
+    root = tmp_path / 'cache'
+    monkeypatch.setenv('CPYWRITE_CACHE_DIR', str(root))
+    monkeypatch.setenv('CPYWRITE_ARCHIVE', str(tmp_path / 'licenses.cpya'))
+    _clear_memos()
+    yield root
+    _clear_memos()
+
+@fixture
+def seeded_cache(cache_root):
+    """Point the license cache at a directory holding the Apache-2.0 header"""
+    cache.store('xml', 'main', 'Apache-2.0', APACHE_XML)
+    return cache_root
+
+@fixture
+def spdx_server(cache_root, monkeypatch):
+    """
+    Serve license data from a local stand-in for the SPDX repositories.
+    Tests can add to the 'files' dict, mapping URL paths to content, and
+    inspect the URL paths of all requests in the 'requests' list, and the
+    client addresses of all connections in the 'connections' list
+    """
+    files = {'/license-list-XML/main/src/Apache-2.0.xml': APACHE_XML}
+    requests = []
+    connections = []
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            connections.append(self.client_address)
+            super().setup()
+
+        def do_GET(self):  # pylint: disable=C0103
+            requests.append(self.path)
+            body = files.get(self.path)
+            self.send_response(200 if body is not None else 404)
+            body = (body or 'Not Found').encode('utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=W0221
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.files = files
+    server.requests = requests
+    server.connections = connections
+    Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv('CPYWRITE_SPDX_URL',
+                       'http://127.0.0.1:%d' % server.server_address[1])
+    yield server
+    pool._POOL.close()
+    server.shutdown()
+    server.server_close()
+
+def _clear_memos():
+    spdx._PARSED_HEADERS.clear()
+    spdx._LICENSE_TEXTS.clear()
+    generator._HEADER_TEMPLATES.clear()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+from pytest import raises
+from cpywrite.detect import fingerprint, find_header, has_notice, \
+    matches_header, update_header
+
+
+def test_notice_detection():
+    c_tokens = ('/**', ' * ', ' *', ' */')
+    assert has_notice('/* (c) Copyright ACME */\n', c_tokens)
+    assert has_notice('#!/bin/sh\n# copyright 2020 me\n', ('#', '# '))
+    assert has_notice('// SPDX-License-Identifier: MIT\n', c_tokens)
+    assert not has_notice('/* intro */\nchar *s = "Copyright";\n', c_tokens)
+    assert not has_notice('s = "# Copyright"\n', ('#', '# '))
+
+def test_header_fingerprint():
+    header = '#\n# main.py\n#\n# Copyright (c) 2020 Me <me@host>\n#\n' \
+             '# Licensed under the Apache License, Version 2.0;\n' \
+             '# you may not use this file except in compliance\n'
+    assert fingerprint(header) == (
+        '# Licensed under the Apache License, Version 2.0;',
+        '# you may not use this file except in compliance')
+    assert matches_header(header.replace('main.py', 'other.py')
+                          .replace('2020', '1999'), header)
+    assert not matches_header('# Licensed under the MIT License\n', header)
+
+def test_header_location():
+    html = '<!DOCTYPE html>\n<!--\n Copyright 2020 Me\n-->\n<html/>\n'
+    start, end = find_header(html, ('<!--', ' ', ' ', '-->'))
+    assert html[start:end] == '<!--\n Copyright 2020 Me\n-->\n'
+
+    script = '#!/bin/sh\r\n# Copyright 2020 Me\r\n# terms\r\necho\r\n'
+    start, end = find_header(script, ('#', '# '))
+    assert script[end:] == 'echo\r\n'
+    assert update_header(script, ('#', '# '), script, 2020, script) is None
+    assert update_header(script, ('#', '# '), script, 2024, script)[0] == \
+        '#!/bin/sh\r\n# Copyright 2020-2024 Me\r\n# terms\r\n'
+
+    assert find_header('# no notice here\nx = 1\n', ('#', '# ')) is None
+
+def test_comments_after_header_are_kept():
+    tokens = ('#', '# ')
+    module = '#\n# Copyright (c) 2020 Me\n#\n# Licensed under the Apache License.\n' \
+             '#\n# Module notes: keep me\n#\n# more notes\nimport os\n'
+    mit = '#\n# Copyright (c) 2024 You\n#\n# Licensed under the MIT License.\n#\n'
+    assert raises(ValueError, update_header, module, tokens, mit, 2024)
+
+    apache = '#\n# Copyright (c) 2024 You\n#\n# Licensed under the Apache License.\n#\n'
+    new_head, end = update_header(module, tokens, mit, 2024, apache)
+    assert new_head + module[end:] == \
+        '#\n# Copyright (c) 2020-2024 Me\n#\n# Licensed under the MIT License.\n' \
+        '#\n# Module notes: keep me\n#\n# more notes\nimport os\n'
+
+    gpl = '#\n# Copyright (c) 2020 Me\n#\n# This program is free software.\n' \
+          '#\n# This program is distributed in the hope that it will be useful.\n#\n'
+    new_head, end = update_header(gpl + '# notes\nx = 1\n', tokens, gpl, 2024)
+    assert new_head == gpl.replace('2020', '2020-2024')
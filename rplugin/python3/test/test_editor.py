@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+from cpywrite import editor
+from cpywrite.editor import (insert_header, make_generator, read_snapshot,
+                             snapshot_expr)
+
+
+class Buffer(list):
+    """A list that records how it's read, like a Vim buffer would"""
+    def __init__(self, lines):
+        super().__init__(lines)
+        self.reads = []
+
+    def __getitem__(self, key):
+        self.reads.append(key)
+        return super().__getitem__(key)
+
+    def __iter__(self):
+        self.reads.append('all')
+        return super().__iter__()
+
+
+def test_header_follows_shebang():
+    buffer = ['#!/usr/bin/env python3', '# -*- coding: utf-8 -*-', 'pass']
+    insert_header(buffer,
+                  '#!/usr/bin/env python3\n# -*- coding: utf-8 -*-\n# header\n',
+                  'python', 'script.py')
+    assert buffer == ['#!/usr/bin/env python3', '# -*- coding: utf-8 -*-',
+                      '# header', 'pass']
+
+
+def test_shebang_is_replaced():
+    buffer = ['#!/bin/sh', 'echo']
+    insert_header(buffer, '#!/usr/bin/env bash\n# header\n', 'sh', 'run.sh',
+                  preserve_shebangs=False)
+    assert buffer == ['#!/usr/bin/env bash', '# header', 'echo']
+
+
+def test_header_follows_php_markup():
+    buffer = ['<?php', 'echo 1;', '?>']
+    insert_header(buffer, '/* header */\n', 'php', 'index.php')
+    assert buffer[0] == '<?php'
+    assert '/* header */' in buffer[1:]
+
+
+def test_commentstring_fallback():
+    assert make_generator('notes.zzz', 'zzz', 'MIT') is None
+
+    generator = make_generator('notes.zzz', 'zzz', 'MIT', '-- %s')
+    assert generator.tokens == ('--', '-- ')
+    assert generator.out_file == 'notes.zzz'
+
+
+def test_only_the_top_of_a_buffer_is_read():
+    buffer = Buffer(['<?php'] + ['echo 1;'] * 100000 + ['?>'])
+    insert_header(buffer, '/* header */\n', 'php', 'index.php')
+    assert buffer.reads == [slice(0, editor._SCAN_LINES)]
+    assert buffer[:4] == ['<?php', 'echo 1;', '/* header */', 'echo 1;']
+
+
+def test_author_tag_in_class_doc(monkeypatch):
+    monkeypatch.setattr(editor, '_get_source_author',
+                        lambda: ('Jane Doe', ' <jane@example.org>'))
+    lines = ['package demo;', 'import demo.ClassDoc.Inner;', '',
+             '/**', ' *', ' */', 'public final class ClassDoc {}']
+    buffer = Buffer(lines + ['// body'] * 100000)
+    insert_header(buffer, '/* header */\n', 'java', 'ClassDoc.java',
+                  include_javadoc=True)
+    assert buffer.reads == [slice(0, editor._SCAN_LINES)] * 2
+
+    assert buffer[:9] == ['/* header */'] + lines[:5] + [
+        ' * @author Jane Doe  &lt;jane@example.org&gt;', ' *', ' */']
+
+    buffer = Buffer(['/**', ' */', 'public final class ShortDoc {}'])
+    insert_header(buffer, '/* header */\n', 'java', 'ShortDoc.java',
+                  include_javadoc=True)
+    assert buffer == ['/* header */', '/**', ' */', 'public final class ShortDoc {}']
+
+
+def test_options_are_read_in_one_snapshot():
+    expr = snapshot_expr('l:license_name')
+    assert expr.count("get(g:, 'cpywrite#") == len(editor._FLAGS)
+    assert "'license_name': l:license_name" in expr
+
+    # Vim returns numbers as strings, Neovim as ints
+    state, invalid = read_snapshot({
+        'filename': 'main.c', 'filetype': 'c', 'commentstring': '/*%s*/',
+        'license_name': 'MIT', 'cursor': ['3', '4'],
+        'options': {'machine_readable': '1', 'verbatim_mode': 0,
+                    'hide_filename': 'yes', 'no_anonymous': [1],
+                    'preserve_shebangs': 2}})
+
+    assert state['cursor'] == (3, 4)
+    assert state['license_name'] == 'MIT'
+    assert state['options'] == {
+        'machine_readable': True, 'verbatim_mode': False,
+        'hide_filename': False, 'no_anonymous': False,
+        'preserve_shebangs': True, 'java#add_class_doc': False}
+    assert invalid == ['hide_filename', 'no_anonymous', 'java#add_class_doc']
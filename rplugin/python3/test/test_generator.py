@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import os
+import subprocess
+from datetime import datetime
 from pytest import raises
+from cpywrite import generator as gen
 from cpywrite.generator import Generator, extensions, _get_language_meta
 from cpywrite.spdx.license import in_pub_domain, _PD_LICENSE_IDS
 from cpywrite import licenses
+import benchmark
 
 
 def test_language_recognition():
@@ -34,7 +39,9 @@ def test_language_recognition():
         'CMakeLists.tXt', 'Makefile', 'mAKeFIle', 'build.Mk', 'build.mAk',
         'Dockerfile', 'doCKerfILE', 'build.dockerFILE', 'file.YmL', 'file.yAmL',
         'config.PROpertiES', 'Config.properTIEs', 'file.conF', 'file.CoNf']
-    dot_files = ['.gitattributes', '.dockerignore', '.xinitrc']
+    dot_files = ['.gitattributes', '.dockerignore', '.xinitrc',
+                 os.path.join('vim-cpywrite', '.bashrc'),
+                 os.path.join('nvim', 'lexrc', '.profile')]
     ini_files = ['config.iNi', 'Config.InI']
     coffeescript_files = ['file.coFFee', 'main.litcoffEe']
     elm_files = ['file.eLm', 'file.Elm', 'file.elM']
@@ -44,7 +51,8 @@ def test_language_recognition():
     restructuredtext_files = ['file.RsT', 'file.rSt']
     vim_script_files = [
         'script.viM', '.VIMrC', 'config.VIMrC', '.gvim', 'config.gvim',
-        '.ideavim', 'script.ideavim', '.exrc', 'config.exrc']
+        '.ideavim', 'script.ideavim', '.exrc', 'config.exrc',
+        os.path.join('dotfiles', '.vimrc')]
     misc_script_files = [
         'file.ADb', 'file.adS', 'file.E', 'file.LuA', 'file.sQl',
         'file.HS', 'file.LhS', 'file.PuRs']
@@ -141,7 +149,7 @@ def test_license_text_generation():
 
     for file_attrs in files:
         ftype, fname = list(*file_attrs.items())
-        for lic in licenses() + _PD_LICENSE_IDS:
+        for lic in licenses() + sorted(_PD_LICENSE_IDS):
             generator.set_file_props(fname, filetype=ftype, rights=lic)
             generate()
             generate(verbose=True)
@@ -170,3 +178,89 @@ def test_file_extension_validation():
 def test_license_id_validation():
     with raises(ValueError):
         Generator(rights='¡Licencia-Nada!')
+
+def test_rendered_headers_are_reused(seeded_cache, monkeypatch):
+    generator = Generator('first.c', rights='Apache-2.0')
+    first = generator.fetch_license_header()
+    assert ' * first.c\n' in first
+    assert ' * Licensed under the Apache License' in first
+    assert len(gen._HEADER_TEMPLATES) == 1
+
+    # same comment style and flags: only the file name should change
+    monkeypatch.setattr(gen.License, 'header', property(lambda _: 1 / 0))
+    generator.set_file_props('second.c')
+    assert generator.fetch_license_header() == first.replace('first.c', 'second.c')
+    assert len(gen._HEADER_TEMPLATES) == 1
+
+    # the year and author are slots in the same template
+    monkeypatch.setattr(gen, '_get_source_author',
+                        lambda: ('J. (Jr.) Doe', ' <jd@example.org>'))
+    header = generator.fetch_license_header()
+    assert ' * Copyright %s J. (Jr.) Doe <jd@example.org>\n' \
+        % datetime.now().year in header
+    assert header.count('Copyright') == 1
+    assert len(gen._HEADER_TEMPLATES) == 1
+
+    generator.set_file_props('second.c', rights='MIT')
+    generator.fetch_license_header(cpu_readable=True)
+    assert len(gen._HEADER_TEMPLATES) == 2
+
+def test_author_lookup_is_cached(tmp_path, monkeypatch):
+    repo = tmp_path / 'repo'
+    subprocess.run(['git', 'init', '-q', str(repo)], check=True)
+    config = repo / '.git' / 'config'
+    config.write_text('[user]\n\tname = Jane Doe\n\temail = jane@example.org\n')
+    monkeypatch.setenv('GIT_CONFIG_GLOBAL', str(tmp_path / 'gitconfig'))
+    monkeypatch.setenv('GIT_CONFIG_SYSTEM', str(tmp_path / 'system'))
+    monkeypatch.chdir(repo)
+
+    calls = []
+    check_output = subprocess.check_output
+    monkeypatch.setattr(subprocess, 'check_output',
+                        lambda *args, **kwargs: calls.append(args) or
+                        check_output(*args, **kwargs))
+
+    assert gen._get_source_author() == ('Jane Doe', ' <jane@example.org>')
+    assert gen._get_source_author() == ('Jane Doe', ' <jane@example.org>')
+    assert len(calls) == 1
+
+    config.write_text('[user]\n\tname = John Doe\n')
+    os.utime(config, ns=(0, 0))
+    author, email = gen._get_source_author()
+    assert author == 'John Doe'
+    assert email.endswith('>') and 'example.org' not in email
+    assert len(calls) == 2
+
+def test_git_config_files(tmp_path):
+    super_git = tmp_path / 'super' / '.git'
+    (super_git / 'modules' / 'lib').mkdir(parents=True)
+    (super_git / 'worktrees' / 'topic').mkdir(parents=True)
+    (super_git / 'worktrees' / 'topic' / 'commondir').write_text('../..\n')
+
+    submodule = tmp_path / 'super' / 'lib'
+    submodule.mkdir()
+    (submodule / '.git').write_text('gitdir: ../.git/modules/lib\n')
+    files = gen._git_config_files(str(submodule))
+    assert os.path.normpath(files[-1]) == \
+        str(super_git / 'modules' / 'lib' / 'config')
+
+    worktree = tmp_path / 'topic'
+    worktree.mkdir()
+    (worktree / '.git').write_text('gitdir: %s\n'
+                                   % (super_git / 'worktrees' / 'topic'))
+    files = gen._git_config_files(str(worktree))
+    assert os.path.normpath(files[-1]) == str(super_git / 'config')
+    assert os.path.normpath(files[-2]) == \
+        str(super_git / 'worktrees' / 'topic' / 'config.worktree')
+
+def test_benchmark(cache_root):
+    benchmark.seed(['Apache-2.0', 'MIT', 'GPL-2.0-or-later'])
+    results = benchmark.run(['Apache-2.0', 'MIT', 'GPL-2.0-or-later'], rounds=1)
+    assert results['cases'] == 3 * len(benchmark.comment_families()) * 16
+    assert results['failures'] == 0
+    assert set(results['cold']) == {'p50', 'p90', 'p99', 'max'}
+    assert benchmark.compare(results, results) == []
+
+    slower = {phase: {pct: ms * 2 for pct, ms in results[phase].items()}
+              for phase in ('cold', 'warm')}
+    assert len(benchmark.compare(slower, results)) == 6
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+from pytest import mark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules only needed to download, parse or write license data, or to ask git
+# who the author is; a session that never does so shouldn't import them
+DEFERRED = ['xml.etree.ElementTree', 'http.client', 'urllib.parse',
+            'urllib.request', 'ssl', 'socket', 'subprocess', 'platform',
+            'concurrent.futures', 'difflib', 'textwrap']
+
+# generous, to allow for slow CI machines: without deferred imports, the
+# editor's imports took over twice as long as they do now
+BUDGET_MS = 100
+
+
+def import_times(statement):
+    """
+    Return the names of the modules imported by running statement in a new
+    interpreter, and the total time in ms it took to import the cpywrite
+    modules it names
+    """
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=ROOT, stderr=subprocess.PIPE, check=True,
+                            universal_newlines=True).stderr
+    names = set()
+    total = 0
+
+    for line in stderr.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        names.add(name.strip())
+        # the statement's own imports are the least indented
+        if name.startswith(' cpywrite'):
+            total += int(cumulative) / 1000
+
+    return (names, total)
+
+@mark.parametrize('statement, extra_deferred', [
+    # what the Vim entry module imports
+    ('import cpywrite.editor, cpywrite.spdx.search', ['tempfile']),
+    ('import cpywrite.__main__', []),
+])
+def test_import_budget(statement, extra_deferred):
+    runs = [import_times(statement) for _ in range(3)]
+    names = runs[0][0]
+
+    assert 'cpywrite.generator' in names
+    assert not [name for name in DEFERRED + extra_deferred if name in names]
+    assert min(total for _, total in runs) < BUDGET_MS
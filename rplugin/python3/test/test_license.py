@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+from pytest import raises
+from cpywrite.spdx import archive, cache, pool
+from cpywrite.spdx.license import License, complete, licenses, prefetch
+from cpywrite.spdx.search import license_names, search
+
+
+def test_cache_dir_resolution(tmp_path, monkeypatch):
+    monkeypatch.delenv('CPYWRITE_CACHE_DIR', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    if os.name != 'nt':
+        assert cache.cache_dir() == os.path.join(str(tmp_path), 'cpywrite')
+
+    monkeypatch.setenv('CPYWRITE_CACHE_DIR', str(tmp_path / 'elsewhere'))
+    assert cache.cache_dir() == str(tmp_path / 'elsewhere')
+
+def test_license_id_resolution():
+    assert License('MIT').spdx_code == 'MIT'
+    assert License('gpl-3.0-OR-later').spdx_code == 'GPL-3.0-or-later'
+
+    with raises(ValueError, match='Did you mean: Apache-2.0'):
+        License('apache2')
+
+    with raises(ValueError, match='index!$'):
+        License('Nonesuch')
+
+def test_prefix_completion():
+    assert complete('') == licenses()
+    assert complete('apache-') == ['Apache-1.0', 'Apache-1.1', 'Apache-2.0']
+    assert complete('GPL-3.0') == [lic for lic in licenses()
+                                   if lic.startswith('GPL-3.0')]
+    assert complete('nonesuch') == []
+
+def test_cache_round_trip(cache_root):
+    assert cache.load('xml', 'main', 'MIT') is None
+    assert cache.store('xml', 'main', 'MIT', '<SPDXLicenseCollection/>')
+    assert cache.load('xml', 'main', 'MIT') == '<SPDXLicenseCollection/>'
+    # entries are keyed by kind and revision, too
+    assert cache.load('txt', 'main', 'MIT') is None
+    assert cache.load('xml', 'a7220b6', 'MIT') is None
+    assert (cache_root / 'main' / 'MIT.xml').is_file()
+    assert (cache_root / 'index.json').is_file()
+    assert not [f for f in os.listdir(str(cache_root)) if f.startswith('.tmp')]
+
+def test_cache_index_is_authoritative(cache_root):
+    cache.store('txt', 'main', 'MIT', 'MIT License')
+    (cache_root / 'main' / 'ISC.txt').write_text('ISC License')
+    assert cache.load('txt', 'main', 'ISC') is None
+    assert cache.load('txt', 'main', 'MIT') == 'MIT License'
+
+def test_lru_cache_eviction():
+    lru = cache.LRUCache(maxsize=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+    lru.put('c', 3)
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+    assert len(lru) == 2
+
+def test_parsed_license_is_memoized(seeded_cache):
+    cache.store('txt', '2e20899c0504ff6c0acfcc1b0994d7163ce46939', 'Apache-2.0',
+                'Apache License\nVersion 2.0, January 2004\n')
+    header = License('Apache-2.0').header
+    text = License('Apache-2.0').license_text
+    assert header[0] == 'Copyright [yyyy] [name of copyright owner]'
+    assert text == ['Apache License', 'Version 2.0, January 2004']
+
+    # evict the persistent cache: later reads should not need it
+    os.remove(str(seeded_cache / 'index.json'))
+    rights = License('Apache-2.0')
+    assert rights.header == header
+    assert rights.license_name == 'Apache License 2.0'
+    assert rights.license_text == text
+
+    # callers get their own copy
+    rights.header.clear()
+    assert rights.header == header
+
+def test_prefetch(spdx_server):
+    text_rev = '2e20899c0504ff6c0acfcc1b0994d7163ce46939'
+    spdx_server.files['/license-list-data/%s/text/Apache-2.0.txt' % text_rev] = \
+        'Apache License'
+    spdx_server.files['/license-list-data/%s/text/ISC.txt' % text_rev] = \
+        'ISC License'
+    progress = []
+
+    summary = prefetch(['Apache-2.0', 'ISC', 'Not-A-License'], jobs=4,
+                       progress=lambda *args: progress.append(args))
+    assert summary == {
+        'fetched': ['Apache-2.0.txt', 'Apache-2.0.xml', 'ISC.txt'],
+        'cached': [],
+        'failed': ['ISC.xml', 'Not-A-License']}
+    assert sorted(p[0] for p in progress) == [1, 2, 3, 4]
+    assert cache.load('txt', text_rev, 'ISC') == 'ISC License'
+    assert License('Apache-2.0').header
+    assert cache.names() == {'Apache-2.0': 'Apache License 2.0'}
+
+    requests = len(spdx_server.requests)
+    summary = prefetch(['Apache-2.0'])
+    assert summary['cached'] == ['Apache-2.0.txt', 'Apache-2.0.xml']
+    assert len(spdx_server.requests) == requests
+
+def test_license_archive(seeded_cache, tmp_path):
+    cache.store('txt', 'main', 'GD', 'GD License')
+    apache_xml = cache.load('xml', 'main', 'Apache-2.0')
+    assert archive.load('xml', 'main', 'Apache-2.0') is None
+    assert archive.build(archive.archive_path(), cache.entries()) == 2
+
+    os.remove(str(seeded_cache / 'index.json'))
+    assert cache.load('xml', 'main', 'Apache-2.0') is None
+    assert archive.load('xml', 'main', 'Apache-2.0') == apache_xml
+    assert archive.load('txt', 'main', 'GD') == 'GD License'
+    assert archive.load('txt', 'main', 'MIT') is None
+    assert License('Apache-2.0').header[-1].startswith('you may not use')
+
+    bad_archive = tmp_path / 'bad.cpya'
+    bad_archive.write_bytes(b'CPYWARC0' + bytes(12))
+    assert raises(ValueError, archive.LicenseArchive, str(bad_archive))
+
+def test_license_search(cache_root):
+    assert search('bsd 3')[0] == 'BSD-3-Clause'
+    assert search('apche 2')[0] == 'Apache-2.0'
+    # ids starting with the query rank above those merely containing it
+    assert search('gpl')[:3] == ['GPL-1.0-only', 'GPL-2.0-only', 'GPL-3.0-only']
+    # with no names downloaded, families are known by their abbreviations
+    assert search('lesser general')[0].startswith('LGPL-')
+    assert search('historical disclaimer') == []
+    # names are only read again when the archive or cache changes
+    names = license_names()
+    assert license_names() is names
+
+    cache.store('xml', 'main', 'HPND', '<SPDXLicenseCollection/>',
+                'Historical Permission Notice and Disclaimer')
+    assert search('historical disclaimer') == ['HPND']
+
+    # names are bundled into archives, too
+    archive.build(archive.archive_path(), cache.entries(), cache.names())
+    os.remove(str(cache_root / 'index.json'))
+    assert search('historical disclaimer', limit=1) == ['HPND']
+    assert license_names() is not names
+
+def test_connections_are_reused(spdx_server):
+    text_rev = '2e20899c0504ff6c0acfcc1b0994d7163ce46939'
+    spdx_server.files['/license-list-data/%s/text/Apache-2.0.txt' % text_rev] = \
+        'Apache License'
+
+    summary = prefetch(['Apache-2.0', 'ISC', 'MIT'], jobs=1)
+    assert len(summary['fetched']) == 2
+    assert len(spdx_server.requests) == 6
+    assert len(spdx_server.connections) == 1
+
+    # dropped connections are replaced
+    for idle in pool._POOL._idle.values():
+        for conn in idle:
+            conn.sock.shutdown(socket.SHUT_RDWR)
+
+    url = os.environ['CPYWRITE_SPDX_URL'] + '/license-list-XML/main/src/Apache-2.0.xml'
+    assert pool.get(url)[0] == 200
+    assert len(spdx_server.connections) == 2
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sys
+from datetime import datetime
+from pytest import raises
+from cpywrite.__main__ import main
+from cpywrite import timing
+from cpywrite.spdx import cache, pool
+
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['cpywrite'] + list(args))
+    with raises(SystemExit) as status:
+        main()
+        sys.exit(0)
+
+    return status.value.code
+
+def test_prefetch_mode(spdx_server, monkeypatch, capsys):
+    assert run_cli(monkeypatch, '--prefetch', 'Apache-2.0') == 1
+    out, err = capsys.readouterr()
+    assert 'Fetched 1 file(s), 0 already cached, 1 failed.' in out
+    assert 'failed: Apache-2.0.txt' in out
+    assert '[2/2]' in err
+
+    spdx_server.files['/license-list-data/%s/text/Apache-2.0.txt'
+                      % '2e20899c0504ff6c0acfcc1b0994d7163ce46939'] = 'Apache License'
+    assert run_cli(monkeypatch, '--prefetch', 'Apache-2.0') == 0
+    assert 'Fetched 1 file(s), 1 already cached, 0 failed.' in capsys.readouterr()[0]
+
+def test_search_mode(cache_root, monkeypatch, capsys):
+    assert run_cli(monkeypatch, '--search', 'bsd 3') == 0
+    assert capsys.readouterr()[0].startswith('BSD-3-Clause\n')
+    assert run_cli(monkeypatch, '--search', 'nonesuch') == 1
+
+def test_parallel_writes(seeded_cache, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    names = ['file%02d.c' % i for i in range(20)]
+    (tmp_path / 'file07.c').write_text('int main() {}\n')
+
+    assert run_cli(monkeypatch, '-j', '4', *(names + ['bad.zzz'])) == 1
+    out = capsys.readouterr()[0].splitlines()
+    assert out[:19] == ['Created new C source file: %s' % name
+                        for name in names if name != 'file07.c']
+    assert out[19:] == ['1 of 21 file(s) failed:',
+                        "  bad.zzz: Unrecognized source file extension: '.zzz'"]
+
+    for name in names:
+        assert ' * %s\n' % name in (tmp_path / name).read_text()
+    assert (tmp_path / 'file07.c').read_text().endswith('*/\nint main() {}\n')
+
+def test_recursive_mode(seeded_cache, tmp_path, monkeypatch, capsys):
+    tree = {
+        '.gitignore': 'build/\n*.gen.c\n/top.c\n',
+        'top.c': '', 'keep.c': '', 'notes.txt': '', 'LICENSE': '',
+        'Makefile': '', 'out.gen.c': '', 'build/skip.c': '',
+        '.git/hook.py': '', 'lib/.gitignore': '!*.gen.c\n',
+        'lib/top.c': '', 'lib/made.gen.c': '', 'lib/vendor/dep.py': ''}
+    root = tmp_path / 'src'
+    for name, text in tree.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(text)
+
+    monkeypatch.chdir(root)
+    assert run_cli(monkeypatch, '-r', '.', '--exclude', 'vendor/') == 0
+    written = sorted(name for name, text in tree.items()
+                     if (root / name).read_text() != text)
+    assert written == ['Makefile', 'keep.c', 'lib/made.gen.c', 'lib/top.c']
+    assert capsys.readouterr()[0] == ''
+
+def test_files_are_replaced_atomically(seeded_cache, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    script = tmp_path / 'run.py'
+    script.write_bytes(b'print(1)\r\nprint(2)\r\n')
+    script.chmod(0o750)
+
+    umask = os.umask(0o027)
+    try:
+        assert run_cli(monkeypatch, 'run.py', 'new.py') == 0
+    finally:
+        os.umask(umask)
+
+    assert (tmp_path / 'run.py.bak').read_bytes() == b'print(1)\r\nprint(2)\r\n'
+    assert script.stat().st_mode & 0o777 == 0o750
+    # the header takes on the file's line endings
+    assert script.read_bytes().count(b'\n') == script.read_bytes().count(b'\r\n')
+    assert script.read_bytes().endswith(b'\r\nprint(1)\r\nprint(2)\r\n')
+    assert (tmp_path / 'new.py').read_text().startswith('#!/usr/bin/env python')
+    # new files get the permissions of the umask in effect when written
+    assert (tmp_path / 'new.py').stat().st_mode & 0o777 == 0o640
+    # no temporary files are left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == \
+        ['cache', 'new.py', 'run.py', 'run.py.bak']
+
+def test_files_must_be_utf8(seeded_cache, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    latin1 = 'print("caf\xe9")\n'.encode('latin-1')
+    (tmp_path / 'cafe.py').write_bytes(latin1)
+
+    assert run_cli(monkeypatch, 'cafe.py') == 1
+    assert "'cafe.py' is not valid UTF-8" in capsys.readouterr()[0]
+    assert (tmp_path / 'cafe.py').read_bytes() == latin1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['cache', 'cafe.py']
+
+def test_skip_existing_headers(seeded_cache, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sources = {
+        'tagged.py': '# SPDX-License-Identifier: MIT\nimport os\n',
+        'notice.c': '/*\n * Copyright 2001 Someone Else\n */\nint x;\n',
+        'string.py': 'NOTICE = "Copyright 2001"\n',
+        'plain.c': 'int x;\n'}
+    for name, text in sources.items():
+        (tmp_path / name).write_text(text)
+
+    for _ in range(2):
+        assert run_cli(monkeypatch, '--skip-existing', *sources) == 0
+
+    assert (tmp_path / 'tagged.py').read_text() == sources['tagged.py']
+    assert (tmp_path / 'notice.c').read_text() == sources['notice.c']
+    assert not (tmp_path / 'notice.c.bak').exists()
+    # added once only
+    for name in ('string.py', 'plain.c'):
+        text = (tmp_path / name).read_text()
+        assert text.count('Licensed under the Apache License') == 1
+        assert text.endswith(sources[name])
+
+def test_skip_existing_without_license_data(cache_root, tmp_path,
+                                            monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pool, 'get', _offline)
+    source = '# Licensed under the Apache License, Version 2.0 (the "License");\n'
+    (tmp_path / 'terms.py').write_text(source)
+
+    assert run_cli(monkeypatch, '--skip-existing', 'terms.py') == 1
+    assert 'No license data for Apache-2.0' in capsys.readouterr()[0]
+    assert (tmp_path / 'terms.py').read_text() == source
+
+def test_update_mode(seeded_cache, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    year = datetime.now().year
+    assert run_cli(monkeypatch, 'old.c', 'bare.c') == 0
+    source = (tmp_path / 'old.c').read_text() \
+        .replace('Copyright %d' % year, 'Copyright 2001-2003')
+    (tmp_path / 'old.c').write_text(source + 'int main() {}\n')
+    (tmp_path / 'bare.c').write_text('int main() {}\n')
+
+    assert run_cli(monkeypatch, '--update', 'old.c', 'bare.c') == 0
+    updated = (tmp_path / 'old.c').read_text()
+    assert updated == source.replace('2001-2003', '2001-%d' % year) + \
+        'int main() {}\n'
+    assert (tmp_path / 'bare.c').read_text() == 'int main() {}\n'
+
+    # nothing left to change
+    os.remove(str(tmp_path / 'old.c.bak'))
+    assert run_cli(monkeypatch, '--update', 'old.c') == 0
+    assert not (tmp_path / 'old.c.bak').exists()
+
+    # swap licenses, keeping the copyright holder
+    assert run_cli(monkeypatch, '--update', '-m', '-l', 'MIT', 'old.c') == 0
+    swapped = (tmp_path / 'old.c').read_text()
+    assert 'SPDX-FileCopyrightText: 2001-%d ' % year in swapped
+    assert ' * SPDX-License-Identifier: MIT\n */\nint main() {}\n' in swapped
+    assert 'Apache' not in swapped
+
+def test_update_swaps_line_comment_headers(seeded_cache, tmp_path,
+                                           monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pool, 'get', _offline)
+    cache.store('xml', 'main', 'Apache-2.0', APACHE_XML)
+    cache.store('xml', 'main', 'MIT', MIT_XML)
+    assert run_cli(monkeypatch, 'a.py') == 0
+    source = (tmp_path / 'a.py').read_text()
+    (tmp_path / 'a.py').write_text(source + '# module notes\nimport os\n')
+
+    assert run_cli(monkeypatch, '--update', '-l', 'MIT', 'a.py') == 0
+    swapped = (tmp_path / 'a.py').read_text()
+    assert 'Distributed under the terms of the MIT License.' in swapped
+    assert 'Apache' not in swapped and 'Unless required' not in swapped
+    assert swapped.endswith('MIT License.\n#\n# module notes\nimport os\n')
+
+    # the end of a header for an unknown license can't be found
+    bespoke = '#\n# Copyright (c) 2001 Me\n#\n# Some bespoke terms of use.\n' \
+              '#\n# module notes\nimport os\n'
+    (tmp_path / 'b.py').write_text(bespoke)
+    capsys.readouterr()
+    assert run_cli(monkeypatch, '--update', '-l', 'MIT', 'b.py') == 1
+    assert "Can't identify the license" in capsys.readouterr()[0]
+    assert (tmp_path / 'b.py').read_text() == bespoke
+
+def test_update_without_license_data(cache_root, tmp_path, monkeypatch,
+                                     capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pool, 'get', _offline)
+    source = '#\n# Copyright (c) 2001 Me\n#\n' \
+             '# Licensed under the Apache License, Version 2.0 (the "License");\n' \
+             '#\n# Unless required by applicable law or agreed to in writing,\n' \
+             '#\nimport os\n'
+    (tmp_path / 'b.py').write_text(source)
+
+    assert run_cli(monkeypatch, '--update', 'b.py') == 1
+    assert 'No license data for Apache-2.0' in capsys.readouterr()[0]
+    assert (tmp_path / 'b.py').read_text() == source
+    assert not (tmp_path / 'b.py.bak').exists()
+
+def test_check_mode(seeded_cache, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'src').mkdir()
+    assert run_cli(monkeypatch, 'src/good.c') == 0
+    (tmp_path / 'src' / 'tagged.py').write_text('# SPDX-License-Identifier: apache-2.0\n')
+    (tmp_path / 'src' / 'mit.py').write_text('# SPDX-License-Identifier: MIT\n')
+    (tmp_path / 'src' / 'bare.c').write_text('int x;\n')
+    capsys.readouterr()
+
+    # a warm cache needs no network
+    monkeypatch.setattr(pool, 'get', lambda url: 1 / 0)
+    assert run_cli(monkeypatch, '--check', '-j', '2', '--report', '-', 'src') == 1
+    report = json.loads(capsys.readouterr()[0])
+    statuses = {res['file']: res['status'] for res in report['files']}
+    assert statuses == {os.path.join('src', 'good.c'): 'ok',
+                        os.path.join('src', 'tagged.py'): 'ok',
+                        os.path.join('src', 'mit.py'): 'wrong-license',
+                        os.path.join('src', 'bare.c'): 'no-header'}
+    assert report['summary']['ok'] == 2
+    assert all(res['seconds'] >= 0 for res in report['files'])
+    # nothing was written
+    assert (tmp_path / 'src' / 'bare.c').read_text() == 'int x;\n'
+
+    assert run_cli(monkeypatch, '--check', 'src/good.c') == 0
+    assert capsys.readouterr()[0] == '1 of 1 file(s) passed.\n'
+
+def test_check_without_license_data(cache_root, tmp_path, monkeypatch,
+                                    capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pool, 'get', _offline)
+    (tmp_path / 'good.py').write_text(
+        '#\n# Copyright (c) 2001 Me\n#\n'
+        '# Licensed under the Apache License, Version 2.0 (the "License");\n'
+        '# you may not use this file except in compliance with the License.\n#\n')
+    (tmp_path / 'mit.py').write_text('# SPDX-License-Identifier: MIT\n')
+
+    assert run_cli(monkeypatch, '--check', '--report', '-', '.') == 1
+    report = json.loads(capsys.readouterr()[0])
+    statuses = {res['file']: res['status'] for res in report['files']}
+    assert statuses == {os.path.join('.', 'good.py'): 'unavailable',
+                        os.path.join('.', 'mit.py'): 'wrong-license'}
+
+def test_profile_mode(seeded_cache, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(timing._STATE, 'enabled', False)
+
+    assert run_cli(monkeypatch, '--profile', 'new.c') == 0
+    phases = [json.loads(line) for line in capsys.readouterr()[1].splitlines()]
+    names = [entry['phase'] for entry in phases]
+    assert names.index('parse') < names.index('header') < names.index('render')
+    assert names[-1] == 'write'
+    assert phases[-1]['file'] == 'new.c' and phases[-1]['depth'] == 0
+    assert {'license': 'Apache-2.0', 'file': 'new.c'}.items() <= \
+        phases[names.index('render')].items()
+    assert all(entry['ms'] >= 0 for entry in phases)
+    assert timing.records()[-len(phases):] == phases
+
+    timing.enable(False)
+    assert run_cli(monkeypatch, 'other.c') == 0
+    assert not capsys.readouterr()[1]
+
+def _offline(url):
+    raise OSError('Network is unreachable')
+
+APACHE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<SPDXLicenseCollection xmlns="http://www.spdx.org/license">
+  <license licenseId="Apache-2.0" name="Apache License 2.0">
+    <standardLicenseHeader>
+      <p>Copyright <alt match=".+" name="copyright">[yyyy] [name of copyright owner]</alt></p>
+      <p>Licensed under the Apache License, Version 2.0 (the "License");
+        you may not use this file except in compliance with the License.
+        You may obtain a copy of the License at</p>
+      <p>http://www.apache.org/licenses/LICENSE-2.0</p>
+      <p>Unless required by applicable law or agreed to in writing, software
+        distributed under the License is distributed on an "AS IS" BASIS.</p>
+    </standardLicenseHeader>
+  </license>
+</SPDXLicenseCollection>
+"""
+
+MIT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<SPDXLicenseCollection xmlns="http://www.spdx.org/license">
+  <license licenseId="MIT" name="MIT License">
+    <text><p>Permission is hereby granted, free of charge.</p></text>
+  </license>
+</SPDXLicenseCollection>
+"""
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from threading import current_thread, main_thread
+from pytest import fixture, importorskip
+from cpywrite import editor
+
+remote = importorskip('cpywrite.remote')
+
+
+class Buffer(list):
+    """A list standing in for a Neovim buffer"""
+    valid = True
+
+
+class Nvim():
+    """
+    Just enough of a Neovim session: calls made with async_call are queued
+    until run_loop() runs them on the calling thread, like the event loop
+    """
+    def __init__(self, lines, options=None):
+        self.current = type('Current', (), {'buffer': Buffer(lines)})()
+        self.options = dict(options or {})
+        self.errors = []
+        self.threads = []
+        self._pending = []
+
+    def eval(self, expr):
+        assert "'license_name': get(g:, 'cpywrite#default_license'" in expr
+        return {'filename': 'main.c', 'filetype': 'c',
+                'commentstring': '/*%s*/', 'cursor': [1, 0],
+                'license_name': 'Apache-2.0',
+                'options': dict({name: 0 for name in editor._FLAGS},
+                                **self.options)}
+
+    def async_call(self, func, *args):
+        self.threads.append(current_thread())
+        self._pending.append((func, args))
+
+    def err_write(self, message):
+        self.errors.append(message)
+
+    def run_loop(self, plugin):
+        plugin._worker.shutdown(wait=True)
+        while self._pending:
+            func, args = self._pending.pop(0)
+            func(*args)
+
+
+@fixture
+def nvim():
+    return Nvim(['int main(void) {}'])
+
+
+def test_header_is_inserted_from_worker(seeded_cache, nvim):
+    plugin = remote.CPYwritePlugin(nvim)
+    plugin.prepend_async([])
+    nvim.run_loop(plugin)
+
+    assert nvim.threads and main_thread() not in nvim.threads
+    assert nvim.errors == []
+    assert nvim.current.buffer[0] == '/**'
+    assert any('Apache License' in line for line in nvim.current.buffer)
+    assert nvim.current.buffer[-1] == 'int main(void) {}'
+
+def test_errors_are_reported(seeded_cache, nvim, monkeypatch, capsys):
+    nvim.options = {'machine_readable': 'on'}
+    plugin = remote.CPYwritePlugin(nvim)
+    plugin.prepend_async(['Nonesuch-1.0'])
+    nvim.run_loop(plugin)
+
+    assert nvim.errors[0] == "'g:cpywrite#machine_readable' should be set to a number!\n"
+    assert 'Nonesuch-1.0' in nvim.errors[-1]
+    assert nvim.current.buffer == ['int main(void) {}']
+
+    def _fail(*args):
+        raise KeyError('copyright')
+
+    monkeypatch.setattr(remote, 'make_generator', _fail)
+    nvim.errors.clear()
+    plugin = remote.CPYwritePlugin(nvim)
+    plugin.prepend_async(['MIT'])
+    nvim.run_loop(plugin)
+
+    assert nvim.errors[-1] == "Error writing header: KeyError('copyright')\n"
+    assert nvim.current.buffer == ['int main(void) {}']
+    assert capsys.readouterr()[0] == ''
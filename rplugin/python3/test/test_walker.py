@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+import os
+from cpywrite.walker import walk
+
+
+def test_symlinks_are_not_followed(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a.c').write_text('')
+    (tmp_path / 'sub' / 'loop').symlink_to('..', target_is_directory=True)
+    (tmp_path / 'sub' / 'b.c').symlink_to(tmp_path / 'a.c')
+
+    assert list(walk([str(tmp_path)])) == [str(tmp_path / 'a.c')]
+
+def test_unreadable_directories_are_skipped(tmp_path, monkeypatch):
+    for name in ('a.c', 'locked/b.c', 'open/c.c'):
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text('')
+
+    scandir = os.scandir
+
+    def _scandir(path):
+        if os.path.basename(path) == 'locked':
+            raise PermissionError(13, 'Permission denied', path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', _scandir)
+
+    assert sorted(walk([str(tmp_path)])) == [str(tmp_path / 'a.c'),
+                                             str(tmp_path / 'open' / 'c.c')]